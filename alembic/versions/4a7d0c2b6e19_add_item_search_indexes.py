@@ -0,0 +1,62 @@
+"""add item search indexes
+
+Revision ID: 4a7d0c2b6e19
+Revises: 8c1f2e7a9b34
+Create Date: 2026-10-18 11:04:57.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7d0c2b6e19'
+down_revision: Union[str, Sequence[str], None] = '8c1f2e7a9b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def trigram_available() -> bool:
+    return op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first() is not None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # adding a stored generated column rewrites the table once
+    op.add_column('items', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_items_search_vector', 'items', ['search_vector'], unique=False, postgresql_using='gin')
+    # typo-tolerant search is optional (SEARCH_TRIGRAM); without pg_trgm on
+    # the server only the full-text index is created
+    if not trigram_available():
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_items_name_trgm', 'items', ['name'], unique=False,
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_items_description_trgm', 'items', ['description'], unique=False,
+        postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_items_description_trgm', table_name='items', if_exists=True)
+    op.drop_index('ix_items_name_trgm', table_name='items', if_exists=True)
+    op.drop_index('ix_items_search_vector', table_name='items')
+    op.drop_column('items', 'search_vector')
@@ -0,0 +1,32 @@
+"""add items user_id id index
+
+Revision ID: 8c1f2e7a9b34
+Revises: bddec1563e4a
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f2e7a9b34'
+down_revision: Union[str, Sequence[str], None] = 'bddec1563e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_items_user_id_id', 'items', ['user_id', 'id'], unique=False)
+    # the composite index has user_id as its leading column, so it covers every
+    # lookup the single-column index served
+    op.drop_index(op.f('ix_items_user_id'), table_name='items')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_items_user_id'), 'items', ['user_id'], unique=False)
+    op.drop_index('ix_items_user_id_id', table_name='items')
@@ -0,0 +1,29 @@
+"""add items version
+
+Revision ID: b7d41c93e5f2
+Revises: e62b9f4d1a07
+Create Date: 2026-10-18 16:48:22.104377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c93e5f2'
+down_revision: Union[str, Sequence[str], None] = 'e62b9f4d1a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a constant default is stored in the catalog, so this does not rewrite the table
+    op.add_column('items', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('items', 'version')
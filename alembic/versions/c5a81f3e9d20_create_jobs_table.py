@@ -0,0 +1,55 @@
+"""create jobs table
+
+Revision ID: c5a81f3e9d20
+Revises: b7d41c93e5f2
+Create Date: 2026-10-18 20:14:51.318402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a81f3e9d20'
+down_revision: Union[str, Sequence[str], None] = 'b7d41c93e5f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"), nullable=False),
+        sa.Column('status', sa.String(length=20), server_default=sa.text("'queued'"), nullable=False),
+        sa.Column('progress', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('cancel_requested', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_jobs_unfinished_id', 'jobs', ['id'], unique=False,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+    op.create_index('ix_jobs_user_id_id', 'jobs', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_user_id_id', table_name='jobs')
+    op.drop_index('ix_jobs_unfinished_id', table_name='jobs', postgresql_where=sa.text("status IN ('queued', 'running')"))
+    op.drop_table('jobs')
@@ -0,0 +1,36 @@
+"""add item_tags reverse index
+
+Revision ID: e62b9f4d1a07
+Revises: 4a7d0c2b6e19
+Create Date: 2026-10-18 14:26:03.551870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e62b9f4d1a07'
+down_revision: Union[str, Sequence[str], None] = '4a7d0c2b6e19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # d3ee62d691b4 dropped the primary key together with the old tags_id
+    # column; drop any duplicate links that slipped in since, then restore it
+    op.execute(
+        'DELETE FROM item_tags a USING item_tags b '
+        'WHERE a.ctid > b.ctid AND a.item_id = b.item_id AND a.tag_id = b.tag_id'
+    )
+    op.create_primary_key('item_tags_pkey', 'item_tags', ['item_id', 'tag_id'])
+    op.create_index('ix_item_tags_tag_id_item_id', 'item_tags', ['tag_id', 'item_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_item_tags_tag_id_item_id', table_name='item_tags')
+    op.drop_constraint('item_tags_pkey', 'item_tags', type_='primary')
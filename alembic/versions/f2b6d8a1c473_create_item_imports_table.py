@@ -0,0 +1,46 @@
+"""create item imports table
+
+Revision ID: f2b6d8a1c473
+Revises: c5a81f3e9d20
+Create Date: 2026-10-18 22:41:07.582914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d8a1c473'
+down_revision: Union[str, Sequence[str], None] = 'c5a81f3e9d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'item_imports',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('columns', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('byte_offset', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('rows', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('created', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('failed', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('errors', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'::jsonb"), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_item_imports_user_id_id', 'item_imports', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_item_imports_user_id_id', table_name='item_imports')
+    op.drop_table('item_imports')
@@ -1,33 +1,96 @@
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.db.deps import get_db
+from app.db.deps import DbSession, get_db, is_replica, run_db, run_on_primary
 from app.models.user import User
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(
+# token -> subject, so a token seen before is not decoded and verified again;
+# both caches hold nothing until create_app() configures them
+token_cache = TTLCache(maxsize=0, ttl=0)
+# subject (email) -> detached User, so hot endpoints authenticate without a query
+user_cache = TTLCache(maxsize=0, ttl=0)
+
+
+# session.info key for the users whose cached entries go once the session commits
+CHANGED_USERS = "changed_users"
+
+
+def invalidate_user(email: str) -> None:
+    user_cache.pop(email)
+
+# Entries are dropped at commit rather than at flush, where a concurrent
+# request could still read the old row and cache it again. Only changes
+# flushed from User instances are seen: other processes, and bulk
+# update(User) statements, leave entries until auth_cache_ttl_seconds runs out.
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    for target in (*session.dirty, *session.deleted):
+        if isinstance(target, User):
+            emails = session.info.setdefault(CHANGED_USERS, set())
+            emails.add(target.email)
+            # an email change must also drop the entry cached under the old address
+            emails.update(inspect(target).attrs.email.history.deleted)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for email in session.info.pop(CHANGED_USERS, ()):
+        invalidate_user(email)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session: Session) -> None:
+    session.info.pop(CHANGED_USERS, None)
+
+
+def load_user(db: Session, email: str) -> User | None:
+    user = db.query(User).filter(User.email == email).first()
+    if user is not None:
+        # detach the fully loaded row so it can outlive this request's session
+        db.expunge(user)
+    return user
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
     )
 
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str | None = payload.get("sub")
-        if email is None:
+    email: str | None = token_cache.get(token)
+    if email is None:
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+            email = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
+        # never keep a token cached past its own expiry
+        expires_at = payload.get("exp")
+        token_cache.set(token, email, ttl=expires_at - time.time() if expires_at else None)
+
+    user: User | None = user_cache.get(email)
     if user is None:
+        generation = user_cache.generation
+        user = await run_db(db, load_user, email)
+        if user is None and is_replica(db):
+            # a user who just registered may not have reached the replica yet
+            user = await run_on_primary(load_user, email)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(email, user, generation=generation)
+
+    if not user.is_active:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
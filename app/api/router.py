@@ -1,8 +1,11 @@
 from fastapi import APIRouter
-from app.api.routes import items, categories, auth, tags
+from app.api.routes import items, imports, categories, auth, tags, jobs
 
 api_router = APIRouter()
+# ahead of items, whose /items/{item_id} would otherwise claim /items/import
+api_router.include_router(imports.router)
 api_router.include_router(items.router)
 api_router.include_router(categories.router)
 api_router.include_router(auth.router)
-api_router.include_router(tags.router)
\ No newline at end of file
+api_router.include_router(tags.router)
+api_router.include_router(jobs.router)
\ No newline at end of file
@@ -2,43 +2,67 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from app.db.deps import get_db
+from app.db.deps import DbSession, get_db, run_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserRead, Token
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.hashing import hashing_pool
+from app.core.security import get_password_hash, verify_and_update_password, create_access_token
 from app.api.deps import get_current_user
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def get_user_by_email(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register(user_in: UserCreate, db: Session = Depends(get_db)) -> User:
-    existing = db.query(User).filter(User.email == user_in.email).first()
+async def register(user_in: UserCreate, db: DbSession = Depends(get_db)) -> User:
+    existing = await run_db(db, get_user_by_email, user_in.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    user = User(
-        email = user_in.email,
-        hashed_password = get_password_hash(user_in.password),
-        is_active = True,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    # bcrypt is deliberately slow, keep it off the event loop and the threadpool
+    hashed_password = await hashing_pool.run(get_password_hash, user_in.password)
+
+    def create(db: Session) -> User:
+        user = User(
+            email = user_in.email,
+            hashed_password = hashed_password,
+            is_active = True,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+
+    return await run_db(db, create)
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
 ) -> Token:
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_db(db, get_user_by_email, form_data.username)
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    
+
+    verified, new_hash = await hashing_pool.run(
+        verify_and_update_password, form_data.password, user.hashed_password
+    )
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    if new_hash is not None:
+        # the bcrypt cost changed since this hash was made, upgrade it in place
+        def rehash(db: Session) -> None:
+            user.hashed_password = new_hash
+            db.commit()
+
+        await run_db(db, rehash)
+
     access_token = create_access_token(subject=user.email)
     return Token(access_token=access_token)
 
 @router.get("/me", response_model=UserRead)
-def read_me(current_user: User = Depends(get_current_user)) -> User:
-    return current_user
\ No newline at end of file
+async def read_me(current_user: User = Depends(get_current_user)) -> User:
+    return current_user
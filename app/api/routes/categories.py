@@ -1,78 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from pydantic import TypeAdapter
+from sqlalchemy import Row, delete, insert, update
 from sqlalchemy.orm import Session
 
-from app.db.deps import get_db
+from app.core.caches import categories_cache
+from app.core.config import settings
+from app.core.etags import conditional_response
+from app.core.responses import CachedModels, negotiate_media_type
+from app.db.deps import DbSession, get_db, is_replica, run_db
 from app.models.category import Category
+from app.models.item import Item
 from app.schemas.category import CategoryCreate, CategoryRead
 from app.api.deps import get_current_user
 from app.models.user import User
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+category_list = TypeAdapter(list[CategoryRead])
+
 
 @router.post("/", response_model=CategoryRead)
-def create_category(
+async def create_category(
     category_in: CategoryCreate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    ) -> Category:
+    ) -> Row:
 
-    category = Category(name=category_in.name)
-    db.add(category)
-    db.commit()
-    db.refresh(category)
+    def create(db: Session) -> Row:
+        category = db.execute(
+            insert(Category).values(name=category_in.name).returning(Category.id, Category.name)
+        ).one()
+        db.commit()
+        return category
+
+    category = await run_db(db, create)
+    categories_cache.bump()
     return category
 
 
 @router.get("/", response_model=list[CategoryRead])
-def list_categories(
-    db: Session = Depends(get_db),
+async def list_categories(
+    if_none_match: str | None = Header(default=None),
+    accept: str | None = Header(default=None),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    ) -> list[Category]:
+    ) -> Response:
+
+    cached = categories_cache.get()
+    if cached is None:
+        version = categories_cache.version
+        categories = await run_db(db, lambda db: db.query(Category).order_by(Category.id).all())
+        cached = CachedModels(category_list, category_list.validate_python(categories, from_attributes=True))
+        # a replica can lag behind the write that last bumped the version,
+        # so what it returned is only kept for as long as that lag may last
+        ttl = settings.replica_max_lag_seconds if is_replica(db) else None
+        categories_cache.set(version, cached, ttl=ttl)
 
-    return db.query(Category).all()
+    media_type = negotiate_media_type(accept)
+    return conditional_response(cached.body(media_type), if_none_match, media_type)
 
 @router.get("/{category_id}", response_model=CategoryRead)
-def get_category(
+async def get_category(
     category_id: int, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     ) -> Category:
 
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await run_db(db, lambda db: db.query(Category).filter(Category.id == category_id).first())
 
     if category is None:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
 
 @router.put("/{category_id}", response_model=CategoryRead)
-def update_category(
+async def update_category(
     category_id: int,
     category_in: CategoryCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> Category:
+) -> Row:
     
-    category = db.query(Category).filter(Category.id == category_id).first()
-    if category is None:
-        raise HTTPException(status_code=404, detail="Category not found")
-    
-    category.name = category_in.name
-    db.commit()
-    db.refresh(category)
+    def apply(db: Session) -> Row:
+        # one round trip: no row back means nothing matched
+        category = db.execute(
+            update(Category)
+            .where(Category.id == category_id)
+            .values(name=category_in.name)
+            .returning(Category.id, Category.name)
+        ).one_or_none()
+        if category is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        # items embed the category name, so their ETags have to change too
+        db.execute(
+            update(Item)
+            .where(Item.category_id == category_id)
+            .values(version=Item.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return category
+
+    category = await run_db(db, apply)
+    categories_cache.bump()
     return category
 
 @router.delete("/{category_id}", response_model=CategoryRead)
-def delete_category(
+async def delete_category(
     category_id: int,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> Category:
-    
-    category = db.query(Category).filter(Category.id == category_id).first()
-    if category is None:
-        raise HTTPException(status_code=404, detail="Category not found")
+) -> Row:
     
-    db.delete(category)
-    db.commit()
-    return category
\ No newline at end of file
+    def remove(db: Session) -> Row:
+        # as the ORM did on delete, leave the category's items uncategorized
+        db.execute(
+            update(Item)
+            .where(Item.category_id == category_id)
+            .values(category_id=None, version=Item.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        category = db.execute(
+            delete(Category).where(Category.id == category_id).returning(Category.id, Category.name)
+        ).one_or_none()
+        if category is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        db.commit()
+        return category
+
+    category = await run_db(db, remove)
+    categories_cache.bump()
+    return category
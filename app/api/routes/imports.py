@@ -0,0 +1,163 @@
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import Row, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+from starlette.requests import ClientDisconnect
+
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.db.deps import DbSession, get_db, run_db
+from app.imports.loader import merge_rows
+from app.imports.reader import ImportFormat, Record, parse_header, parse_records, read_records, skip_bytes, validate_rows
+from app.models.item_import import ItemImport
+from app.models.user import User
+from app.schemas.item import ItemImportRead
+
+router = APIRouter(prefix="/items/import", tags=["items"])
+
+IMPORT_READ_COLUMNS = (
+    ItemImport.id, ItemImport.format, ItemImport.byte_offset.label("offset"), ItemImport.columns,
+    ItemImport.rows, ItemImport.created, ItemImport.failed, ItemImport.errors,
+    ItemImport.created_at, ItemImport.updated_at,
+)
+
+# the body is read as it arrives rather than parsed by FastAPI, so describe it here
+IMPORT_BODY = {
+    "requestBody": {
+        "content": {
+            "application/x-ndjson": {"schema": {"type": "string"}},
+            "text/csv": {"schema": {"type": "string"}},
+        },
+    },
+}
+
+def load_batch(db: Session, item_import: Row, records: list[Record], user_id: int) -> Row:
+    first_row = item_import.rows + 1
+    rows, failures = validate_rows(parse_records(records, item_import.format, item_import.columns))
+    created = 0
+    if rows:
+        created, unknown = merge_rows(db, {first_row + index: row for index, row in rows.items()}, user_id)
+        failures.update({row - first_row: detail for row, detail in unknown.items()})
+
+    errors = [
+        {"row": first_row + index, "offset": records[index].start, "detail": failures[index]}
+        for index in sorted(failures)
+    ]
+    room = max(settings.item_import_max_errors - item_import.failed, 0)
+    # the batch and the offset past it commit together, and only if no other
+    # upload of the same import got there first
+    item_import = db.execute(
+        update(ItemImport)
+        .where(ItemImport.id == item_import.id, ItemImport.byte_offset == item_import.offset)
+        .values(
+            byte_offset=records[-1].end,
+            rows=ItemImport.rows + len(records),
+            created=ItemImport.created + created,
+            failed=ItemImport.failed + len(failures),
+            errors=ItemImport.errors.op("||")(literal(errors[:room], JSONB)),
+            updated_at=func.now(),
+        )
+        .returning(*IMPORT_READ_COLUMNS)
+    ).one_or_none()
+    if item_import is None:
+        raise HTTPException(status_code=409, detail="Import is being resumed by another upload")
+
+    db.commit()
+    return item_import
+
+async def run_import(db: DbSession, item_import: Row, records: AsyncIterator[Record], user_id: int) -> Row:
+    batch = []
+    try:
+        async for record in records:
+            batch.append(record)
+            if len(batch) == settings.item_import_batch_size:
+                item_import = await run_db(db, load_batch, item_import, batch, user_id)
+                batch = []
+    except ClientDisconnect:
+        # whatever arrived after the last committed batch is dropped; the
+        # client resumes from the committed offset
+        return item_import
+    if batch:
+        item_import = await run_db(db, load_batch, item_import, batch, user_id)
+    return item_import
+
+@router.post("", response_model=ItemImportRead, openapi_extra=IMPORT_BODY)
+async def start_import(
+    request: Request,
+    format: ImportFormat = Query(default="ndjson"),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Row:
+    records = read_records(request.stream(), 0, format, settings.item_import_max_record_bytes)
+    columns = None
+    offset = 0
+    if format == "csv":
+        header = await anext(records, None)
+        if header is not None and header.data is None:
+            raise HTTPException(status_code=413, detail="CSV header is too large")
+        columns = parse_header(header) if header is not None else []
+        if "name" not in columns:
+            raise HTTPException(status_code=400, detail="CSV header must include a name column")
+        offset = header.end
+
+    def create(db: Session) -> Row:
+        item_import = db.execute(
+            insert(ItemImport)
+            .values(user_id=current_user.id, format=format, columns=columns, byte_offset=offset)
+            .returning(*IMPORT_READ_COLUMNS)
+        ).one()
+        db.commit()
+        return item_import
+
+    item_import = await run_db(db, create)
+    return await run_import(db, item_import, records, current_user.id)
+
+@router.post("/{import_id}", response_model=ItemImportRead, openapi_extra=IMPORT_BODY)
+async def resume_import(
+    import_id: int,
+    request: Request,
+    offset: int = Query(ge=0),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Row:
+    item_import = await run_db(db, lambda db: db.execute(
+        select(*IMPORT_READ_COLUMNS).where(ItemImport.id == import_id, ItemImport.user_id == current_user.id)
+    ).one_or_none())
+    if item_import is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    if offset > item_import.offset:
+        raise HTTPException(status_code=409, detail=f"Import is at offset {item_import.offset}")
+
+    # the body starts at `offset`; anything before the committed offset was
+    # loaded already, so the file may just as well be sent again in full
+    chunks = skip_bytes(request.stream(), item_import.offset - offset)
+    records = read_records(chunks, item_import.offset, item_import.format, settings.item_import_max_record_bytes)
+    return await run_import(db, item_import, records, current_user.id)
+
+@router.get("", response_model=list[ItemImportRead])
+async def list_imports(
+    limit: int = Query(default=20, ge=1, le=100),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[Row]:
+    return await run_db(db, lambda db: db.execute(
+        select(*IMPORT_READ_COLUMNS)
+        .where(ItemImport.user_id == current_user.id)
+        .order_by(ItemImport.id.desc())
+        .limit(limit)
+    ).all())
+
+@router.get("/{import_id}", response_model=ItemImportRead)
+async def get_import(
+    import_id: int,
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Row:
+    item_import = await run_db(db, lambda db: db.execute(
+        select(*IMPORT_READ_COLUMNS).where(ItemImport.id == import_id, ItemImport.user_id == current_user.id)
+    ).one_or_none())
+    if item_import is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return item_import
@@ -1,124 +1,685 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+import csv
+import io
+from typing import AsyncIterator, Iterator, Literal, Sequence
 
-from app.db.deps import get_db
+from fastapi import APIRouter, Body, Depends, Header, Query, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    Integer, Row, String, Text, cast, column, delete, func, insert, literal, literal_column, null, select,
+    text, tuple_, union_all, update, values,
+)
+from pydantic import TypeAdapter
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.core.config import settings
+from app.core.etags import etag_matches, etag_versions, version_etag
+from app.core.pagination import CountMode, count_rows, encode_cursor, decode_cursor
+from app.core.responses import model_response, negotiate_media_type
+from app.core.search import item_search_filter, item_search_rank
+from app.db.deps import DbSession, get_db, run_db
 from app.models.item import Item
-from app.schemas.item import ItemCreate, ItemRead, ItemUpdate
+from app.schemas.item import (
+    ItemBulkResult, ItemBulkUpdate, ItemCreate, ItemFacetCount, ItemFacets, ItemRead, ItemUpdate,
+)
 from app.api.deps import get_current_user
 from app.models.user import User
-from app.models.tag import Tag
+from app.models.category import Category
+from app.models.tag import Tag, item_tags
+from app.schemas.category import CategoryRead
+from app.schemas.tag import TagRead
 
 
 router = APIRouter(prefix="/items", tags=["items"])
 
+BULK_MAX_ITEMS = 1000
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CSV_FIELDS = ["id", "name", "description", "category_id", "category", "tag_ids", "tags"]
+
+item_read = TypeAdapter(ItemRead)
+item_list = TypeAdapter(list[ItemRead])
+item_facets_read = TypeAdapter(ItemFacets)
+bulk_result_list = TypeAdapter(list[ItemBulkResult])
+
+def item_load_options():
+    # ItemRead serializes tags and category, so load them up front: the
+    # category rides along on the item row, and the tags of a whole page come
+    # back in a single SELECT ... WHERE item_id IN (...)
+    return selectinload(Item.tags), joinedload(Item.category)
+
+def item_query(db: Session):
+    return db.query(Item).options(*item_load_options())
+
+def item_read_columns():
+    # everything ItemRead needs from the items row, written so INSERT, UPDATE
+    # and DELETE can hand it back through RETURNING; the category name comes
+    # from a correlated subquery rather than a second SELECT. The column is
+    # spelled out because SQLAlchemy does not correlate into INSERT ... RETURNING
+    # and would add a cross join with items instead.
+    category_name = (
+        select(Category.name).where(Category.id == literal_column("items.category_id")).scalar_subquery()
+    )
+    return (
+        Item.id, Item.name, Item.description, Item.category_id, Item.version,
+        category_name.label("category_name"),
+    )
+
+def item_read_from_row(row: Row, tags: Sequence[Row]) -> ItemRead:
+    category = None
+    if row.category_id is not None:
+        category = CategoryRead(id=row.category_id, name=row.category_name)
+    return ItemRead(
+        id=row.id,
+        name=row.name,
+        description=row.description,
+        category_id=row.category_id,
+        category=category,
+        tags=[TagRead(id=tag.id, name=tag.name) for tag in tags],
+    )
+
+def item_tags_by_id(db: Session, tag_ids: list[int] | None) -> list[Row]:
+    if not tag_ids:
+        return []
+    tags = db.execute(select(Tag.id, Tag.name).where(Tag.id.in_(tag_ids)).order_by(Tag.id)).all()
+    if len(tags) != len(set(tag_ids)):
+        raise HTTPException(status_code=400, detail="One or more tags not found")
+    return tags
+
+def item_tag_rows(db: Session, item_id: int) -> list[Row]:
+    return db.execute(
+        select(Tag.id, Tag.name)
+        .join(item_tags, item_tags.c.tag_id == Tag.id)
+        .where(item_tags.c.item_id == item_id)
+        .order_by(Tag.id)
+    ).all()
+
+def replace_item_tags(db: Session, tag_ids_by_item: dict[int, set[int]]) -> None:
+    # writes only the difference: links that survive are neither deleted nor
+    # re-inserted, so retagging an item with dozens of tags touches one row
+    links = [
+        {"item_id": item_id, "tag_id": tag_id}
+        for item_id, tag_ids in tag_ids_by_item.items()
+        for tag_id in tag_ids
+    ]
+    stale = delete(item_tags).where(item_tags.c.item_id.in_(tag_ids_by_item))
+    if links:
+        kept = tuple_(item_tags.c.item_id, item_tags.c.tag_id).in_(
+            [(link["item_id"], link["tag_id"]) for link in links]
+        )
+        stale = stale.where(~kept)
+    db.execute(stale)
+    if links:
+        db.execute(pg_insert(item_tags).values(links).on_conflict_do_nothing())
+
+def existing_ids(db: Session, id_column, ids: set[int]) -> set[int]:
+    # one lookup for a whole batch instead of one per element
+    if not ids:
+        return set()
+    return set(db.scalars(select(id_column).where(id_column.in_(ids))))
+
+def validate_references(
+    db: Session,
+    items_in: list[ItemCreate] | list[ItemBulkUpdate],
+) -> dict[int, tuple[int, str]]:
+    tag_ids = {tag_id for item_in in items_in for tag_id in item_in.tag_ids or ()}
+    category_ids = {item_in.category_id for item_in in items_in if item_in.category_id is not None}
+    known_tags = existing_ids(db, Tag.id, tag_ids)
+    known_categories = existing_ids(db, Category.id, category_ids)
+
+    failures = {}
+    for index, item_in in enumerate(items_in):
+        if not set(item_in.tag_ids or ()) <= known_tags:
+            failures[index] = (status.HTTP_400_BAD_REQUEST, "One or more tags not found")
+        elif item_in.category_id is not None and item_in.category_id not in known_categories:
+            failures[index] = (status.HTTP_400_BAD_REQUEST, "Category not found")
+    return failures
+
+def filter_items(query, current_user: User, q: str | None, category_id: int | None, tag_ids: list[int] | None):
+    query = query.where(Item.user_id == current_user.id)
+
+    if q:
+        query = query.where(item_search_filter(q))
+
+    if category_id is not None:
+        query = query.where(Item.category_id == category_id)
+
+    if tag_ids:
+        query = query.where(Item.tags.any(Tag.id.in_(tag_ids)))
+
+    return query
+
+def export_chunk(items: list[Item], format: str) -> str:
+    if format == "ndjson":
+        return "".join(ItemRead.model_validate(item).model_dump_json() + "\n" for item in items)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for item in items:
+        writer.writerow([
+            item.id,
+            item.name,
+            item.description,
+            item.category_id,
+            item.category.name if item.category else None,
+            ";".join(str(tag.id) for tag in item.tags),
+            ";".join(tag.name for tag in item.tags),
+        ])
+    return buffer.getvalue()
+
+def bulk_results(
+    item_ids: list[int | None],
+    failures: dict[int, tuple[int, str]],
+    success_code: int,
+) -> list[ItemBulkResult]:
+    results = []
+    for index, item_id in enumerate(item_ids):
+        if index in failures:
+            status_code, detail = failures[index]
+            results.append(ItemBulkResult(index=index, id=item_id, status_code=status_code, detail=detail))
+        else:
+            results.append(ItemBulkResult(index=index, id=item_id, status_code=success_code))
+    return results
+
 @router.post("/", response_model=ItemRead)
-def create_item(
+async def create_item(
     item_in: ItemCreate, 
-    db: Session = Depends(get_db), 
+    response: Response,
+    db: DbSession = Depends(get_db), 
     current_user: User = Depends(get_current_user)
     ) -> Item:
-    item = Item(
-        name=item_in.name, 
-        description=item_in.description, 
-        category_id=item_in.category_id,
-        user_id=current_user.id,
-    )
-    tags = []
-    if item_in.tag_ids:
-        tags = db.query(Tag).filter(Tag.id.in_(item_in.tag_ids)).all()
-        if len(tags) != len(set(item_in.tag_ids)):
-            raise HTTPException(status_code=400, detail="One or more tags not found")
-    item.tags = tags
 
-    db.add(item)
-    db.commit()
-    db.refresh(item)
+    def create(db: Session) -> tuple[ItemRead, int]:
+        tags = item_tags_by_id(db, item_in.tag_ids)
+        row = db.execute(
+            insert(Item)
+            .values(
+                name=item_in.name,
+                description=item_in.description,
+                category_id=item_in.category_id,
+                user_id=current_user.id,
+            )
+            .returning(*item_read_columns())
+        ).one()
+        if tags:
+            db.execute(insert(item_tags), [{"item_id": row.id, "tag_id": tag.id} for tag in tags])
+        db.commit()
+        return item_read_from_row(row, tags), row.version
 
-    return item
+    item, version = await run_db(db, create)
+    response.headers["ETag"] = version_etag(version)
+    return model_response(item_read, item, response, validate=False)
 
 @router.get("/", response_model=list[ItemRead])
-def list_items(
-    db: Session = Depends(get_db),
+async def list_items(
+    response: Response,
+    db: DbSession = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(default=None, min_length=1),
     q: str | None = Query(default=None, min_length=1),
     category_id: int | None = Query(default=None, ge=1),
     tag_ids: list[int] | None = Query(default=None),
+    sort: Literal["id", "relevance"] = Query(default="id"),
+    count: CountMode | None = Query(default=None),
+    accept: str | None = Header(default=None),
     current_user: User = Depends(get_current_user),
     ) -> list[Item]:
 
-    query = db.query(Item).filter(Item.user_id == current_user.id)
+    query = filter_items(select(Item), current_user, q, category_id, tag_ids)
+    count_query = filter_items(select(Item.id), current_user, q, category_id, tag_ids)
 
-    if q:
-        query = query.filter(Item.name.ilike(f"%{q}%"))
-    
-    if category_id is not None:
-        query = query.filter(Item.category_id == category_id)
+    ranked = sort == "relevance" and q is not None
+    if ranked:
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="Cursor pagination requires sort=id")
+        query = query.order_by(item_search_rank(q).desc(), Item.id)
+    else:
+        query = query.order_by(Item.id)
 
-    if tag_ids:
-        query = query.filter(Item.tags.any(Tag.id.in_(tag_ids)))
+    # keyset pagination: seek past the last id of the previous page on the
+    # (user_id, id) index instead of reading and discarding `skip` rows
+    if cursor is not None:
+        after_id = decode_cursor(cursor).get("id")
+        if not isinstance(after_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(Item.id > after_id)
+    else:
+        query = query.offset(skip)
+
+    # one extra row tells us whether another page exists
+    query = query.limit(limit + 1).options(*item_load_options())
+
+    def fetch(db: Session) -> tuple[list[Item], tuple[int, str] | None]:
+        items = list(db.scalars(query))
+        # the total is opt-in, since even the cheapest mode costs a query
+        total = count_rows(db, count_query, count, settings.pagination_count_cap) if count else None
+        return items, total
 
+    items, total = await run_db(db, fetch)
+    has_more = len(items) > limit
+    if has_more:
+        items = items[:limit]
+        if not ranked:
+            response.headers["X-Next-Cursor"] = encode_cursor(id=items[-1].id)
 
-    return query.offset(skip).limit(limit).all()
+    # metadata rides in headers so the body stays the bare array clients expect
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total[0])
+        response.headers["X-Total-Count-Mode"] = total[1]
+
+    response.headers["Vary"] = "Accept"
+    return model_response(item_list, items, response, media_type=negotiate_media_type(accept))
+
+@router.get("/facets", response_model=ItemFacets)
+async def item_facets(
+    db: DbSession = Depends(get_db),
+    q: str | None = Query(default=None, min_length=1),
+    category_id: int | None = Query(default=None, ge=1),
+    tag_ids: list[int] | None = Query(default=None),
+    current_user: User = Depends(get_current_user),
+    ) -> ItemFacets:
+
+    # the filtered ids are computed once and both breakdowns aggregate over
+    # them; the tag side reaches item_tags by item_id through its primary key
+    filtered = filter_items(
+        select(Item.id, Item.category_id), current_user, q, category_id, tag_ids
+    ).cte("filtered")
+    query = union_all(
+        select(literal("total"), null(), null(), func.count()).select_from(filtered),
+        select(literal("category"), Category.id, Category.name, func.count())
+        .select_from(filtered.join(Category, Category.id == filtered.c.category_id))
+        .group_by(Category.id),
+        select(literal("tag"), Tag.id, Tag.name, func.count())
+        .select_from(
+            filtered
+            .join(item_tags, item_tags.c.item_id == filtered.c.id)
+            .join(Tag, Tag.id == item_tags.c.tag_id)
+        )
+        .group_by(Tag.id),
+    )
+    rows = await run_db(db, lambda db: db.execute(query).all())
+
+    total = 0
+    facets: dict[str, list[ItemFacetCount]] = {"category": [], "tag": []}
+    for facet, facet_id, name, count in rows:
+        if facet == "total":
+            total = count
+        else:
+            facets[facet].append(ItemFacetCount(id=facet_id, name=name, count=count))
+    for counts in facets.values():
+        counts.sort(key=lambda facet_count: (-facet_count.count, facet_count.id))
+
+    facets_read = ItemFacets(total=total, categories=facets["category"], tags=facets["tag"])
+    return model_response(item_facets_read, facets_read, validate=False)
+
+@router.get("/export")
+async def export_items(
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    db: DbSession = Depends(get_db),
+    q: str | None = Query(default=None, min_length=1),
+    category_id: int | None = Query(default=None, ge=1),
+    tag_ids: list[int] | None = Query(default=None),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+
+    query = (
+        filter_items(select(Item), current_user, q, category_id, tag_ids)
+        .order_by(Item.id)
+        .options(*item_load_options())
+        # a server-side cursor hands rows over one batch at a time, and the
+        # selectin loader fetches tags per batch instead of for the whole export
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    header = ",".join(EXPORT_CSV_FIELDS) + "\r\n" if format == "csv" else ""
+    # the cursor's transaction sits idle whenever the client reads slower than
+    # we write, so the pool-wide idle_in_transaction_session_timeout would end
+    # a long export mid-stream; lift it for this transaction only
+    keep_open = text("SET LOCAL idle_in_transaction_session_timeout = 0")
+
+    # the response outlives the dependency's cleanup, so the stream closes the
+    # session itself once the last batch is out; dropping each finished batch
+    # from the identity map keeps memory flat regardless of the export size
+    def stream_sync(db: Session) -> Iterator[str]:
+        try:
+            yield header
+            db.execute(keep_open)
+            for batch in db.scalars(query).partitions():
+                yield export_chunk(batch, format)
+                for item in batch:
+                    db.expunge(item)
+        finally:
+            db.close()
+
+    async def stream_async(db: AsyncSession) -> AsyncIterator[str]:
+        try:
+            yield header
+            await db.execute(keep_open)
+            result = await db.stream_scalars(query)
+            async for batch in result.partitions():
+                yield export_chunk(batch, format)
+                for item in batch:
+                    db.expunge(item)
+        finally:
+            await db.close()
+
+    if format == "csv":
+        media_type, filename = "text/csv", "items.csv"
+    else:
+        media_type, filename = "application/x-ndjson", "items.ndjson"
+
+    return StreamingResponse(
+        stream_async(db) if isinstance(db, AsyncSession) else stream_sync(db),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/bulk", response_model=list[ItemBulkResult])
+async def bulk_create_items(
+    items_in: list[ItemCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[ItemBulkResult]:
+
+    def create(db: Session) -> list[ItemBulkResult]:
+        failures = validate_references(db, items_in)
+        valid = [(index, item_in) for index, item_in in enumerate(items_in) if index not in failures]
+
+        new_ids = []
+        if valid:
+            # a single multi-row INSERT ... RETURNING, ids in the order of the rows
+            new_ids = list(db.scalars(
+                insert(Item).returning(Item.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "name": item_in.name,
+                        "description": item_in.description,
+                        "category_id": item_in.category_id,
+                        "user_id": current_user.id,
+                    }
+                    for _, item_in in valid
+                ],
+            ))
+            links = [
+                {"item_id": item_id, "tag_id": tag_id}
+                for item_id, (_, item_in) in zip(new_ids, valid)
+                for tag_id in set(item_in.tag_ids)
+            ]
+            if links:
+                db.execute(insert(item_tags), links)
+        db.commit()
+
+        created = {index: item_id for item_id, (index, _) in zip(new_ids, valid)}
+        return bulk_results(
+            [created.get(index) for index in range(len(items_in))],
+            failures,
+            status.HTTP_201_CREATED,
+        )
+
+    return model_response(bulk_result_list, await run_db(db, create), validate=False)
+
+@router.put("/bulk", response_model=list[ItemBulkResult])
+async def bulk_update_items(
+    items_in: list[ItemBulkUpdate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[ItemBulkResult]:
+
+    def update_all(db: Session) -> list[ItemBulkResult]:
+        owned = set(db.scalars(
+            select(Item.id).where(
+                Item.user_id == current_user.id,
+                Item.id.in_({item_in.id for item_in in items_in}),
+            )
+        ))
+        failures = validate_references(db, items_in)
+        seen = set()
+        for index, item_in in enumerate(items_in):
+            if item_in.id not in owned:
+                failures[index] = (status.HTTP_404_NOT_FOUND, "Item not found")
+            elif item_in.id in seen:
+                failures[index] = (status.HTTP_400_BAD_REQUEST, "Duplicate item id")
+            seen.add(item_in.id)
+        valid = [item_in for index, item_in in enumerate(items_in) if index not in failures]
+
+        if valid:
+            # like update_item, a None field means "leave unchanged", so the
+            # whole batch becomes one UPDATE ... FROM (VALUES ...) with COALESCE
+            rows = values(
+                column("id", Integer),
+                column("name", String),
+                column("description", Text),
+                column("category_id", Integer),
+                name="batch",
+            ).data([
+                (item_in.id, item_in.name, item_in.description, item_in.category_id)
+                for item_in in valid
+            ])
+            db.execute(
+                update(Item)
+                .where(Item.id == rows.c.id)
+                .values(
+                    name=func.coalesce(rows.c.name, Item.name),
+                    description=func.coalesce(rows.c.description, Item.description),
+                    # an all-NULL VALUES column comes back as text, so cast it back
+                    category_id=func.coalesce(cast(rows.c.category_id, Integer), Item.category_id),
+                    version=Item.version + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+            retagged = {item_in.id: set(item_in.tag_ids) for item_in in valid if item_in.tag_ids is not None}
+            if retagged:
+                replace_item_tags(db, retagged)
+        db.commit()
+
+        return bulk_results([item_in.id for item_in in items_in], failures, status.HTTP_200_OK)
+
+    return model_response(bulk_result_list, await run_db(db, update_all), validate=False)
+
+@router.delete("/bulk", response_model=list[ItemBulkResult])
+async def bulk_delete_items(
+    item_ids: list[int] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[ItemBulkResult]:
+
+    def delete_all(db: Session) -> list[ItemBulkResult]:
+        owned = select(Item.id).where(Item.user_id == current_user.id, Item.id.in_(item_ids))
+        db.execute(delete(item_tags).where(item_tags.c.item_id.in_(owned)))
+        deleted = set(db.scalars(
+            delete(Item)
+            .where(Item.user_id == current_user.id, Item.id.in_(item_ids))
+            .returning(Item.id)
+            .execution_options(synchronize_session=False)
+        ))
+        db.commit()
+
+        failures = {
+            index: (status.HTTP_404_NOT_FOUND, "Item not found")
+            for index, item_id in enumerate(item_ids)
+            if item_id not in deleted
+        }
+        return bulk_results(item_ids, failures, status.HTTP_200_OK)
+
+    return model_response(bulk_result_list, await run_db(db, delete_all), validate=False)
 
 @router.get("/{item_id}", response_model=ItemRead)
-def get_item(
+async def get_item(
     item_id: int, 
-    db: Session = Depends(get_db), 
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    db: DbSession = Depends(get_db), 
     current_user: User = Depends(get_current_user),
     ) -> Item:
 
-    item = db.query(Item).filter(Item.id == item_id, Item.user_id == current_user.id).first()
+    owned = (Item.id == item_id, Item.user_id == current_user.id)
+    if if_none_match is not None:
+        # revalidation reads one integer from the items row instead of the
+        # item with its tags and category
+        version = await run_db(db, lambda db: db.scalar(select(Item.version).where(*owned)))
+        if version is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if etag_matches(if_none_match, version_etag(version)):
+            return Response(status_code=304, headers={"ETag": version_etag(version)})
+
+    item = await run_db(db, lambda db: item_query(db).filter(*owned).first())
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    return item
+    response.headers["ETag"] = version_etag(item.version)
+    return model_response(item_read, item, response)
 
 @router.put("/{item_id}", response_model=ItemRead)
-def update_item(
+async def update_item(
     item_id: int,
     item_in: ItemUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_match: str | None = Header(default=None),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Item:
-    item = db.query(Item).filter(Item.id == item_id, Item.user_id == current_user.id).first()
 
-    if item is None:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    if item_in.name is not None:
-        item.name = item_in.name
-
-    if item_in.description is not None:
-        item.description = item_in.description
-
-    if item_in.category_id is not None:
-        item.category_id = item_in.category_id
-
-    if item_in.tag_ids is not None:
-        if item_in.tag_ids:
-            tags = db.query(Tag).filter(Tag.id.in_(item_in.tag_ids)).all()
-            if len(tags) != len(set(item_in.tag_ids)):
-                raise HTTPException(status_code=400, detail="One or more tags not found")
-            item.tags = tags
+    def apply(db: Session) -> tuple[ItemRead, int]:
+        changes = {
+            field: value
+            for field, value in (
+                ("name", item_in.name),
+                ("description", item_in.description),
+                ("category_id", item_in.category_id),
+            )
+            if value is not None
+        }
+        owned = (Item.id == item_id, Item.user_id == current_user.id)
+        expected = etag_versions(if_match) if if_match is not None else None
+        # the version check rides on the UPDATE itself, so a concurrent
+        # writer cannot slip in between a check and the write
+        conditions = owned if expected is None else (*owned, Item.version.in_(expected))
+        if changes or item_in.tag_ids is not None:
+            statement = (
+                update(Item)
+                .where(*conditions)
+                .values(**changes, version=Item.version + 1)
+                .returning(*item_read_columns())
+            )
         else:
-            item.tags = []
-    db.commit()
-    db.refresh(item)
-    return item
+            statement = select(*item_read_columns()).where(*conditions)
+        # no row back means the item does not exist, is not ours, or has moved
+        # past the version the client last saw
+        row = db.execute(statement).one_or_none()
+        if row is None:
+            if expected is not None and db.scalar(select(Item.id).where(*owned)) is not None:
+                raise HTTPException(status_code=412, detail="Item was modified")
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        if item_in.tag_ids is not None:
+            tags = item_tags_by_id(db, item_in.tag_ids)
+            replace_item_tags(db, {item_id: {tag.id for tag in tags}})
+        else:
+            tags = item_tag_rows(db, item_id)
+
+        db.commit()
+        return item_read_from_row(row, tags), row.version
+
+    item, version = await run_db(db, apply)
+    response.headers["ETag"] = version_etag(version)
+    return model_response(item_read, item, response, validate=False)
 
 
 @router.delete("/{item_id}", response_model=ItemRead)
-def delete_item(
+async def delete_item(
     item_id: int, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     ) -> Item:
 
-    item = db.query(Item).filter(Item.id == item_id, Item.user_id == current_user.id).first()
-    if item is None:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    db.delete(item)
-    db.commit()
-    return item
\ No newline at end of file
+    def remove(db: Session) -> ItemRead:
+        # unlink the tags first, reading their names back from the join
+        tags = db.execute(
+            delete(item_tags)
+            .where(
+                item_tags.c.item_id == item_id,
+                item_tags.c.tag_id == Tag.id,
+                Item.id == item_tags.c.item_id,
+                Item.user_id == current_user.id,
+            )
+            .returning(Tag.id, Tag.name)
+        ).all()
+        row = db.execute(
+            delete(Item)
+            .where(Item.id == item_id, Item.user_id == current_user.id)
+            .returning(*item_read_columns())
+        ).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        db.commit()
+        return item_read_from_row(row, sorted(tags, key=lambda tag: tag.id))
+
+    return model_response(item_read, await run_db(db, remove), validate=False)
+
+@router.post("/{item_id}/tags", response_model=ItemRead)
+async def add_item_tags(
+    item_id: int,
+    response: Response,
+    tag_ids: list[int] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ItemRead:
+
+    def add(db: Session) -> tuple[ItemRead, int]:
+        row = db.execute(
+            update(Item)
+            .where(Item.id == item_id, Item.user_id == current_user.id)
+            .values(version=Item.version + 1)
+            .returning(*item_read_columns())
+        ).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        # one set-based INSERT ... SELECT: unknown tag ids match no row and
+        # tags the item already has are skipped by the primary key
+        db.execute(
+            pg_insert(item_tags)
+            .from_select(["item_id", "tag_id"], select(literal(item_id), Tag.id).where(Tag.id.in_(tag_ids)))
+            .on_conflict_do_nothing()
+        )
+        tags = item_tag_rows(db, item_id)
+        if not set(tag_ids) <= {tag.id for tag in tags}:
+            raise HTTPException(status_code=400, detail="One or more tags not found")
+
+        db.commit()
+        return item_read_from_row(row, tags), row.version
+
+    item, version = await run_db(db, add)
+    response.headers["ETag"] = version_etag(version)
+    return model_response(item_read, item, response, validate=False)
+
+@router.delete("/{item_id}/tags", response_model=ItemRead)
+async def remove_item_tags(
+    item_id: int,
+    response: Response,
+    tag_ids: list[int] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ItemRead:
+
+    def remove(db: Session) -> tuple[ItemRead, int]:
+        row = db.execute(
+            update(Item)
+            .where(Item.id == item_id, Item.user_id == current_user.id)
+            .values(version=Item.version + 1)
+            .returning(*item_read_columns())
+        ).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        # ids the item is not tagged with are ignored, so retries are harmless
+        db.execute(delete(item_tags).where(item_tags.c.item_id == item_id, item_tags.c.tag_id.in_(tag_ids)))
+        tags = item_tag_rows(db, item_id)
+        db.commit()
+        return item_read_from_row(row, tags), row.version
+
+    item, version = await run_db(db, remove)
+    response.headers["ETag"] = version_etag(version)
+    return model_response(item_read, item, response, validate=False)
@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy import Row, case, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.db.deps import DbSession, get_db, run_db
+from app.jobs.handlers import JOB_KINDS
+from app.jobs.runner import UNFINISHED, job_runner
+from app.models.job import Job
+from app.models.user import User
+from app.schemas.job import JobCreate, JobRead
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+JOB_READ_COLUMNS = (
+    Job.id, Job.kind, Job.params, Job.status, Job.progress, Job.total, Job.result, Job.error,
+    Job.cancel_requested, Job.created_at, Job.started_at, Job.finished_at,
+)
+
+
+@router.post("/", response_model=JobRead, status_code=202)
+async def create_job(
+    job_in: JobCreate,
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Row:
+    kind = JOB_KINDS.get(job_in.kind)
+    if kind is None:
+        raise HTTPException(status_code=400, detail="Unknown job kind")
+    try:
+        params = kind.params.model_validate(job_in.params)
+    except ValidationError as exc:
+        # reported like any other invalid request body
+        raise RequestValidationError([
+            {**error, "loc": ("body", "params", *error["loc"])}
+            for error in exc.errors(include_url=False, include_context=False)
+        ])
+
+    def create(db: Session) -> Row:
+        job = db.execute(
+            insert(Job)
+            .values(user_id=current_user.id, kind=job_in.kind, params=params.model_dump())
+            .returning(*JOB_READ_COLUMNS)
+        ).one()
+        db.commit()
+        return job
+
+    job = await run_db(db, create)
+    job_runner.wake()
+    return job
+
+@router.get("/", response_model=list[JobRead])
+async def list_jobs(
+    limit: int = Query(default=20, ge=1, le=100),
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[Row]:
+    return await run_db(db, lambda db: db.execute(
+        select(*JOB_READ_COLUMNS)
+        .where(Job.user_id == current_user.id)
+        .order_by(Job.id.desc())
+        .limit(limit)
+    ).all())
+
+@router.get("/{job_id}", response_model=JobRead)
+async def get_job(
+    job_id: int,
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Row:
+    job = await run_db(db, lambda db: db.execute(
+        select(*JOB_READ_COLUMNS).where(Job.id == job_id, Job.user_id == current_user.id)
+    ).one_or_none())
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=JobRead)
+async def cancel_job(
+    job_id: int,
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Row:
+
+    def apply(db: Session) -> Row:
+        # a queued job is cancelled outright; a running one stops at its next
+        # progress report, keeping the batches it already committed
+        queued = Job.status == "queued"
+        job = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.user_id == current_user.id, Job.status.in_(UNFINISHED))
+            .values(
+                cancel_requested=True,
+                status=case((queued, "cancelled"), else_=Job.status),
+                finished_at=case((queued, func.now()), else_=Job.finished_at),
+            )
+            .returning(*JOB_READ_COLUMNS)
+        ).one_or_none()
+        if job is None:
+            exists = db.scalar(select(Job.id).where(Job.id == job_id, Job.user_id == current_user.id))
+            if exists is None:
+                raise HTTPException(status_code=404, detail="Job not found")
+            raise HTTPException(status_code=409, detail="Job already finished")
+
+        db.commit()
+        return job
+
+    return await run_db(db, apply)
@@ -1,73 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from pydantic import TypeAdapter
+from sqlalchemy import Row, Select, delete, insert, select, update
 from sqlalchemy.orm import Session
 
+from app.core.caches import tags_cache
+from app.core.config import settings
+from app.core.etags import conditional_response
+from app.core.responses import CachedModels, negotiate_media_type
 from app.api.deps import get_current_user
-from app.db.deps import get_db
-from app.models.tag import Tag
+from app.db.deps import DbSession, get_db, is_replica, run_db
+from app.models.item import Item
+from app.models.tag import Tag, item_tags
 from app.models.user import User
 from app.schemas.tag import TagCreate, TagRead
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
+tag_list = TypeAdapter(list[TagRead])
+
+def bump_item_versions(db: Session, item_ids: Select) -> None:
+    # items embed their tags' names, so a tag change must change their ETags
+    db.execute(
+        update(Item)
+        .where(Item.id.in_(item_ids))
+        .values(version=Item.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
 @router.post("/", response_model=TagRead)
-def create_tag(
+async def create_tag(
     tag_in: TagCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> Tag:
-    tag = Tag(name=tag_in.name)
-    db.add(tag)
-    db.commit()
-    db.refresh(tag)
+) -> Row:
+    def create(db: Session) -> Row:
+        tag = db.execute(
+            insert(Tag).values(name=tag_in.name).returning(Tag.id, Tag.name)
+        ).one()
+        db.commit()
+        return tag
+
+    tag = await run_db(db, create)
+    tags_cache.bump()
     return tag
 
 @router.get("/", response_model=list[TagRead])
-def list_tags(
-    db: Session = Depends(get_db),
+async def list_tags(
+    if_none_match: str | None = Header(default=None),
+    accept: str | None = Header(default=None),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> list[Tag]:
-    return db.query(Tag).all()
+) -> Response:
+    cached = tags_cache.get()
+    if cached is None:
+        version = tags_cache.version
+        tags = await run_db(db, lambda db: db.query(Tag).order_by(Tag.id).all())
+        cached = CachedModels(tag_list, tag_list.validate_python(tags, from_attributes=True))
+        # a replica can lag behind the write that last bumped the version,
+        # so what it returned is only kept for as long as that lag may last
+        ttl = settings.replica_max_lag_seconds if is_replica(db) else None
+        tags_cache.set(version, cached, ttl=ttl)
+
+    media_type = negotiate_media_type(accept)
+    return conditional_response(cached.body(media_type), if_none_match, media_type)
 
 @router.get("/{tag_id}", response_model=TagRead)
-def get_tag(
+async def get_tag(
     tag_id: int,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Tag:
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+    tag = await run_db(db, lambda db: db.query(Tag).filter(Tag.id == tag_id).first())
     if tag is None:
         raise HTTPException(status_code=404, detail="Tag not found")
     return tag
 
 @router.put("/{tag_id}", response_model=TagRead)
-def update_tag(
+async def update_tag(
     tag_id: int,
     tag_in: TagCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> Tag:
+) -> Row:
     
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if tag is None:
-        raise HTTPException(status_code=404, detail="Tag not found")
-    
-    tag.name = tag_in.name
-    db.commit()
-    db.refresh(tag)
+    def apply(db: Session) -> Row:
+        # one round trip: no row back means nothing matched
+        tag = db.execute(
+            update(Tag)
+            .where(Tag.id == tag_id)
+            .values(name=tag_in.name)
+            .returning(Tag.id, Tag.name)
+        ).one_or_none()
+        if tag is None:
+            raise HTTPException(status_code=404, detail="Tag not found")
+
+        bump_item_versions(db, select(item_tags.c.item_id).where(item_tags.c.tag_id == tag_id))
+        db.commit()
+        return tag
+
+    tag = await run_db(db, apply)
+    tags_cache.bump()
     return tag
 
 @router.delete("/{tag_id}", response_model=TagRead)
-def delete_tag(
+async def delete_tag(
     tag_id: int,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> Tag:
+) -> Row:
     
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if tag is None:
-        raise HTTPException(status_code=404, detail="Tag not found")
+    def remove(db: Session) -> Row:
+        # the ORM used to unlink the tag from its items on delete; do it
+        # directly, served by the (tag_id, item_id) index
+        unlinked = delete(item_tags).where(item_tags.c.tag_id == tag_id).returning(item_tags.c.item_id).cte()
+        bump_item_versions(db, select(unlinked.c.item_id))
+        tag = db.execute(
+            delete(Tag).where(Tag.id == tag_id).returning(Tag.id, Tag.name)
+        ).one_or_none()
+        if tag is None:
+            raise HTTPException(status_code=404, detail="Tag not found")
+
+        db.commit()
+        return tag
 
-    db.delete(tag)
-    db.commit()
+    tag = await run_db(db, remove)
+    tags_cache.bump()
     return tag
-    
\ No newline at end of file
@@ -0,0 +1,178 @@
+import asyncio
+from collections import deque
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import AdmissionLimit, Settings
+from app.core.metrics import format_labels, render_gauge
+
+UNLIMITED = "unlimited"
+DEFAULT_GROUP = "default"
+
+
+class AdmissionGate:
+    """Lets `concurrency` requests in at once, queues up to `queue` more, refuses the rest.
+
+    Only ever touched from the event loop, so plain counters need no lock. A
+    released slot is handed straight to the oldest waiter, so a queued request
+    cannot be overtaken by one that arrives later.
+    """
+
+    def __init__(self, concurrency: int, queue: int, queue_timeout: float):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # handed a slot just as the wait ran out
+                return True
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self.rejected += 1
+            return False
+        except BaseException:
+            # the client went away while queued; pass on a slot it was just given
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        return True
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+def admission_capacity(settings: Settings) -> int:
+    """How many requests one worker process may admit without starving its pool."""
+    pool = settings.db_pool_size + settings.db_max_overflow
+    return pool - settings.job_workers - settings.admission_reserved_connections
+
+
+def build_gates(limits: dict[str, AdmissionLimit], capacity: int) -> dict[str, AdmissionGate]:
+    """One gate per group, admitting no more requests in all than `capacity`.
+
+    Groups with a concurrency of their own keep it; the rest split what is
+    left between them, at least one request each.
+    """
+    shared = [name for name, limit in limits.items() if limit.concurrency is None]
+    fixed = sum(limit.concurrency for limit in limits.values() if limit.concurrency is not None)
+    share = max((capacity - fixed) // len(shared), 1) if shared else 0
+    return {
+        name: AdmissionGate(
+            concurrency=share if limit.concurrency is None else limit.concurrency,
+            queue=limit.queue,
+            queue_timeout=limit.queue_timeout_seconds,
+        )
+        for name, limit in limits.items()
+    }
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware holding DB-bound requests at their route group's gate.
+
+    Routes are keyed "[METHOD ]/path", either an exact path or a prefix ending
+    in "*". Exact paths beat prefixes, keys with a method beat those without
+    and longer prefixes beat shorter ones; unmatched requests belong to the
+    default group. A request holds its slot until its response, streamed or
+    not, has been sent.
+    """
+
+    def __init__(self, app: ASGIApp, gates: dict[str, AdmissionGate], routes: dict[str, str], retry_after: int):
+        missing = ({DEFAULT_GROUP} | set(routes.values())) - set(gates) - {UNLIMITED}
+        if missing:
+            raise ValueError(f"no admission limits for route groups: {', '.join(sorted(missing))}")
+
+        self.app = app
+        self.gates = gates
+        self.retry_after = retry_after
+        self.exact: dict[str, str] = {}
+        self.prefixes: list[tuple[str, str]] = []
+        for key, group in routes.items():
+            if key.endswith("*"):
+                self.prefixes.append((key[:-1], group))
+            else:
+                self.exact[key] = group
+        self.prefixes.sort(key=lambda prefix: len(prefix[0]), reverse=True)
+
+    def group(self, method: str, path: str) -> str:
+        for key in (f"{method} {path}", path):
+            if key in self.exact:
+                return self.exact[key]
+        for key in (f"{method} {path}", path):
+            for prefix, group in self.prefixes:
+                if key.startswith(prefix):
+                    return group
+        return DEFAULT_GROUP
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        group = self.group(scope["method"], scope["path"])
+        if group == UNLIMITED:
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.gates[group]
+        if not await gate.acquire():
+            response = JSONResponse(
+                {"detail": "Server is busy, try again later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+def render_admission(gates: dict[str, AdmissionGate]) -> str:
+    lines = render_gauge(
+        "atlas_admission_active",
+        "Requests holding an admission slot.",
+        [(format_labels(("group",), (name,)), gate.active) for name, gate in gates.items()],
+    )
+    lines.extend(render_gauge(
+        "atlas_admission_queued",
+        "Requests waiting for an admission slot.",
+        [(format_labels(("group",), (name,)), gate.queued) for name, gate in gates.items()],
+    ))
+    lines.append("# HELP atlas_admission_rejected_total Requests turned away with 503.")
+    lines.append("# TYPE atlas_admission_rejected_total counter")
+    lines.extend(
+        f"atlas_admission_rejected_total{{{format_labels(('group',), (name,))}}} {gate.rejected}"
+        for name, gate in gates.items()
+    )
+    return "\n".join(lines) + "\n"
+
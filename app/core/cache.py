@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time-to-live."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # counts invalidations, so a value loaded before one is not stored after it
+        self.generation = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize: int, ttl: float) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self.generation += 1
+            self._data.clear()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, generation: int | None = None) -> None:
+        """Store a value; given the generation read before loading it, only if nothing was invalidated since."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class VersionedCache:
+    """Holds one value until the version is bumped or its TTL runs out."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._entry: tuple[int, float, Any] | None = None
+        self._lock = threading.Lock()
+
+    def configure(self, ttl: float) -> None:
+        with self._lock:
+            self.ttl = ttl
+            self.version += 1
+            self._entry = None
+
+    def get(self) -> Any:
+        with self._lock:
+            if self._entry is None:
+                return None
+
+            version, expires_at, value = self._entry
+            if version != self.version or expires_at <= time.monotonic():
+                return None
+            return value
+
+    def set(self, version: int, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        # a value computed before a concurrent bump is stale, don't keep it
+        with self._lock:
+            if version == self.version and ttl > 0:
+                self._entry = (version, time.monotonic() + ttl, value)
+
+    def bump(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entry = None
@@ -0,0 +1,7 @@
+from app.core.cache import VersionedCache
+
+# the category and tag lists rarely change but every client page load fetches
+# them; whatever changes them (routes, jobs) bumps the version, which drops the
+# cached body and its ETag. Both hold nothing until create_app() sets their TTL
+categories_cache = VersionedCache(ttl=0)
+tags_cache = VersionedCache(ttl=0)
@@ -0,0 +1,147 @@
+import gzip
+import zlib
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.etags import encoded_etag
+
+# bodies other than these (images, archives, already encoded) do not shrink
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/x-ndjson", "text/")
+# preferred order when the client ranks several encodings equally
+ENCODINGS = ("br", "gzip")
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Pick the best encoding we support from an Accept-Encoding header."""
+    if not accept_encoding:
+        return None
+
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    wildcard = weights.get("*", 0.0)
+    ranked = [(weights.get(encoding, wildcard), encoding) for encoding in ENCODINGS]
+    best_weight = max(weight for weight, _ in ranked)
+    if best_weight <= 0:
+        return None
+    return next(encoding for weight, encoding in ranked if weight == best_weight)
+
+
+class StreamCompressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31 writes the gzip header and trailer around the deflate stream
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # every chunk is flushed, so streamed responses still arrive progressively
+        if self._brotli is not None:
+            chunk = self._brotli.process(data)
+            return chunk + (self._brotli.finish() if final else self._brotli.flush())
+        chunk = self._zlib.compress(data)
+        return chunk + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def compress_body(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware: negotiates br or gzip for bodies of at least `minimum_size` bytes.
+
+    Complete bodies are compressed in one call and get an exact Content-Length;
+    streamed bodies (the export) are compressed chunk by chunk. A compressed
+    body's ETag gets the coding as a suffix ("abc" becomes "abc-gzip"), and a
+    304 answering a suffixed If-None-Match keeps the tag the client sent.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: StreamCompressor | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                if start["status"] == 304:
+                    headers = MutableHeaders(raw=start["headers"])
+                    etag = headers.get("etag")
+                    if etag is not None and encoded_etag(etag, encoding) in request_headers.get("if-none-match", ""):
+                        headers["ETag"] = encoded_etag(etag, encoding)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is not None:
+                await send({
+                    "type": "http.response.body",
+                    "body": compressor.compress(body, final=not more_body),
+                    "more_body": more_body,
+                })
+                return
+
+            # first body message: decide once for the whole response
+            headers = MutableHeaders(raw=start["headers"])
+            compressible = (
+                "content-encoding" not in headers
+                and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            )
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            if not compressible or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], encoding)
+            if more_body:
+                del headers["Content-Length"]
+                compressor = StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                body = compressor.compress(body, final=False)
+            else:
+                body = compress_body(body, encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,14 +1,156 @@
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
+
+class AdmissionLimit(BaseModel):
+    # None: a share of what the connection pool's size plus its overflow
+    # leaves once the groups with a concurrency of their own are counted
+    concurrency: int | None = None
+    queue: int = 0
+    queue_timeout_seconds: float = 1
+
+
 class Settings(BaseSettings):
     app_name: str = "Atlas"
     database_url: str
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
+    # bcrypt cost factor; stored hashes with a different cost are upgraded on login
+    bcrypt_rounds: int = 12
+    # password hashing runs in its own process pool; extra calls fail fast with 503
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+    # verified tokens and resolved users are cached per process; 0 disables.
+    # A user changed through the ORM is dropped from this process's cache at
+    # commit; other processes may authenticate the old row until the TTL runs out
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_entries: int = 10_000
+    # cached category/tag lists; other worker processes only see a change
+    # once this runs out, since invalidation is per process
+    list_cache_ttl_seconds: int = 30
+    # connection pool, per engine and per worker process
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    # enforced by Postgres on every connection; 0 disables. GET /items/export
+    # lifts the idle-in-transaction limit for its own transaction, which
+    # waits on the client between batches
+    db_statement_timeout_ms: int = 30_000
+    db_idle_in_transaction_timeout_ms: int = 60_000
+    # serve requests from the async engine; False falls back to the sync
+    # engine on the threadpool, mostly to benchmark the two against each other
+    db_async: bool = True
+    # read-only requests go to these (a JSON list in the environment) while
+    # a replica is at most max_lag behind; lag is checked every check_interval.
+    # A client that just wrote reads from the primary for read_your_writes
+    replica_database_urls: list[str] = []
+    replica_max_lag_seconds: float = 5
+    replica_check_interval_seconds: float = 2
+    replica_read_your_writes_seconds: int = 10
+    # typo-tolerant item search via pg_trgm, whose indexes the migrations only
+    # create when the server provides it. None: on if the database has the
+    # extension installed, checked once at startup
+    search_trigram: bool | None = None
+    # serialize item responses with pydantic-core directly instead of
+    # FastAPI's validate + jsonable_encoder + json.dumps path
+    fast_json: bool = True
+    # responses of at least this many bytes are sent with br or gzip when the
+    # client accepts it; brotli quality stays low since bodies are compressed
+    # on every request
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    # admission control in front of the database, per route group: at most
+    # `concurrency` requests run at once, `queue` more wait up to
+    # queue_timeout_seconds and the rest get 503 straight away. Routes map
+    # "[METHOD ]/path" (exact, or a prefix ending in *) to a group; unmatched
+    # routes are "default" and "unlimited" ones are never held back. All
+    # groups together admit no more than the pool can serve at once, less the
+    # job workers and admission_reserved_connections, so an admitted request
+    # never waits out db_pool_timeout_seconds for a connection
+    admission_limits: dict[str, AdmissionLimit] = {
+        "default": AdmissionLimit(queue=30),
+        # each export streams from one connection for as long as it runs
+        "export": AdmissionLimit(concurrency=2, queue=2),
+        # likewise for an import, batch after batch
+        "import": AdmissionLimit(concurrency=2, queue=2),
+    }
+    admission_routes: dict[str, str] = {
+        "/health*": "unlimited",
+        "/metrics": "unlimited",
+        "/docs*": "unlimited",
+        "/openapi.json": "unlimited",
+        # served from their cache nearly always
+        "GET /categories/": "unlimited",
+        "GET /tags/": "unlimited",
+        "GET /items/export": "export",
+        "POST /items/import*": "import",
+    }
+    admission_retry_after_seconds: int = 1
+    # connections left over for what no gate holds: the lists' cache misses,
+    # and the primary lookup a request served by a replica makes for a user
+    # who has only just registered, while it keeps its replica session
+    admission_reserved_connections: int = 2
+    # background jobs: every worker process runs up to job_workers at once on
+    # its own threads (0 runs none), polling for queued ones every
+    # job_poll_interval. A running job without progress for job_stale_seconds
+    # is presumed dead with its process and claimed again, at most
+    # job_max_attempts times in all; a batch that runs longer than that loses
+    # its job to the new claim and is rolled back
+    job_workers: int = 2
+    job_poll_interval_seconds: float = 1
+    job_stale_seconds: int = 300
+    job_max_attempts: int = 3
+    job_batch_size: int = 500
+    # POST /items/import loads and commits item_import_batch_size rows at a
+    # time; an import keeps only its first item_import_max_errors failed rows
+    item_import_batch_size: int = 5000
+    item_import_max_errors: int = 1000
+    # records longer than this fail without ever being held in memory whole
+    item_import_max_record_bytes: int = 1024 * 1024
+    # count=capped on list endpoints stops counting past this many rows
+    pagination_count_cap: int = 1000
+
+    # python -m app.server: gunicorn with uvicorn workers. 0 workers means one
+    # per CPU available to the container; each worker restarts after roughly
+    # max_requests (+/- jitter, so they do not all restart at once)
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: int = 0
+    web_max_requests: int = 10_000
+    web_max_requests_jitter: int = 1_000
+    web_timeout_seconds: int = 60
+    web_graceful_timeout_seconds: int = 30
 
     class Config:
         env_file = ".env"
         extra = "allow"
 
-settings = Settings()
\ No newline at end of file
+class LazySettings:
+    """The process-wide Settings, read from the environment on first use.
+
+    create_app() can install an explicit instance first, so nothing needs the
+    environment just to import the app.
+    """
+
+    def __init__(self) -> None:
+        object.__setattr__(self, "_settings", None)
+
+    def configure(self, settings: Settings) -> None:
+        object.__setattr__(self, "_settings", settings)
+
+    def get(self) -> Settings:
+        if self._settings is None:
+            self.configure(Settings())
+        return self._settings
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.get(), name, value)
+
+
+settings = LazySettings()
\ No newline at end of file
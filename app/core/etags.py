@@ -0,0 +1,66 @@
+import hashlib
+from typing import NamedTuple
+
+from fastapi import Response
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+
+
+# a compressed body is a different representation and needs its own strong
+# validator, so the compression middleware tags it with the content-coding
+CODING_SUFFIXES = ("-br", "-gzip")
+
+
+def make_etag(body: bytes) -> str:
+    # derived from the content, so every worker process agrees on it
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def version_etag(version: int) -> str:
+    return f'"{version}"'
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+def identity_etag(etag: str) -> str:
+    # neither content hashes nor versions contain "-", so the suffix is unambiguous
+    for suffix in CODING_SUFFIXES:
+        if etag.endswith(suffix + '"'):
+            return etag[:-len(suffix) - 1] + '"'
+    return etag
+
+def etag_versions(header: str) -> set[int] | None:
+    """The versions named by an If-Match header, or None for "*".
+
+    Only strong tags can satisfy If-Match, so weak and foreign ones are dropped.
+    """
+    versions = set()
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return None
+        candidate = identity_etag(candidate)
+        if candidate.startswith('"') and candidate.endswith('"') and candidate[1:-1].isdigit():
+            versions.add(int(candidate[1:-1]))
+    return versions
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if header is None:
+        return False
+    candidates = {identity_etag(candidate.strip().removeprefix("W/")) for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+def conditional_response(
+    cached: CachedBody,
+    if_none_match: str | None,
+    media_type: str = "application/json",
+) -> Response:
+    # each media type has its own body and so its own ETag
+    headers = {"ETag": cached.etag, "Vary": "Accept"}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type=media_type, headers=headers)
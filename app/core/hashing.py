@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from fastapi import HTTPException, status
+
+from app.core.security import configure_password_hashing
+
+T = TypeVar("T")
+
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class HashingPool:
+    """Runs password hashing in worker processes; calls beyond `max_pending` fail fast with 503."""
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def configure(self, workers: int, max_pending: int, rounds: int) -> None:
+        self.shutdown()
+        with self._lock:
+            self.workers = workers
+            self.max_pending = max_pending
+            self.rounds = rounds
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # never fork the server itself, which runs threads by now; the
+                # workers import the app afresh and get their bcrypt cost here
+                # rather than from an environment that may not configure it
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(START_METHOD),
+                    initializer=configure_password_hashing,
+                    initargs=(self.rounds,),
+                )
+            return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent authentication requests",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# turns every call away until create_app() configures it
+hashing_pool = HashingPool(workers=0, max_pending=0, rounds=0)
@@ -0,0 +1,184 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: tuple[str, ...], value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+
+        for label_values, values in sorted(series.items()):
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {values[-2]}')
+            lines.append(f"{self.name}_count{{{labels}}} {values[-2]}")
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]}")
+        return lines
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ",".join(
+        f'{name}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+
+def render_gauge(name: str, help: str, samples: list[tuple[str, float]]) -> list[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    lines.extend(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}" for labels, value in samples)
+    return lines
+
+
+request_duration = Histogram(
+    "atlas_http_request_duration_seconds",
+    "Request latency by route template and status.",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+request_db_queries = Histogram(
+    "atlas_http_request_db_queries",
+    "Database statements executed per request.",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS,
+)
+request_db_duration = Histogram(
+    "atlas_http_request_db_duration_seconds",
+    "Time spent executing database statements per request.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    query_seconds: float = 0.0
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def instrument_engine(engine: Engine) -> None:
+    # attributes the statement count and time to whichever request runs it;
+    # contextvars follow the request into the threadpool and async greenlets
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_request.get() is not None:
+            context.query_started_at = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        started_at = getattr(context, "query_started_at", None)
+        if stats is not None and started_at is not None:
+            stats.queries += 1
+            stats.query_seconds += time.perf_counter() - started_at
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: no per-request task or body wrapping, just two clock reads."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global _in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        with _in_flight_lock:
+            _in_flight += 1
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            with _in_flight_lock:
+                _in_flight -= 1
+            current_request.reset(token)
+
+            # label by the matched route template, never the raw path, so
+            # /items/1 and /items/2 share a series
+            route = scope.get("route")
+            route_label = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            request_duration.observe((method, route_label, str(status_code)), elapsed)
+            request_db_queries.observe((method, route_label), stats.queries)
+            request_db_duration.observe((method, route_label), stats.query_seconds)
+
+
+def render_metrics(pools: dict[str, dict]) -> str:
+    lines = render_gauge("atlas_http_requests_in_flight", "Requests currently being served.", [("", _in_flight)])
+    for histogram in (request_duration, request_db_queries, request_db_duration):
+        lines.extend(histogram.render())
+
+    for key, help in (
+        ("checked_out", "Connections currently checked out of the pool."),
+        ("idle", "Connections idle in the pool."),
+        ("overflow", "Connections open beyond the pool size."),
+    ):
+        lines.extend(render_gauge(
+            f"atlas_db_pool_{key}",
+            help,
+            [(format_labels(("engine",), (name,)), snapshot[key]) for name, snapshot in pools.items()],
+        ))
+
+    lines.append("# HELP atlas_db_pool_checkout_wait_seconds Time to obtain a pooled connection.")
+    lines.append("# TYPE atlas_db_pool_checkout_wait_seconds histogram")
+    for name, snapshot in pools.items():
+        labels = format_labels(("engine",), (name,))
+        cumulative = 0
+        for bound, count in snapshot["wait_seconds_buckets"].items():
+            cumulative += count
+            le = "+Inf" if bound == "inf" else bound
+            lines.append(f'atlas_db_pool_checkout_wait_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"atlas_db_pool_checkout_wait_seconds_count{{{labels}}} {snapshot['checkouts']}")
+        lines.append(f"atlas_db_pool_checkout_wait_seconds_sum{{{labels}}} {snapshot['wait_seconds_total']}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,50 @@
+import base64
+import binascii
+import json
+from typing import Any, Literal
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session
+
+CountMode = Literal["exact", "capped", "estimated"]
+
+
+def encode_cursor(**values: Any) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError):
+        values = None
+
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+def count_rows(db: Session, query: Select, mode: CountMode, cap: int) -> tuple[int, str]:
+    """Count the rows of `query`, returning the count and how far to trust it.
+
+    The second value is "exact", "capped" (the real total is at least the
+    count) or "estimated" (the planner's row estimate, no rows are read).
+    """
+    if mode == "estimated":
+        return estimate_rows(db, query), "estimated"
+
+    if mode == "capped":
+        # reading one row past the cap tells us whether we stopped short
+        counted = db.scalar(select(func.count()).select_from(query.limit(cap + 1).subquery()))
+        if counted > cap:
+            return cap, "capped"
+        return counted, "exact"
+
+    return db.scalar(select(func.count()).select_from(query.subquery())), "exact"
+
+def estimate_rows(db: Session, query: Select) -> int:
+    connection = db.connection()
+    compiled = query.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,73 @@
+from typing import Any
+
+import msgpack
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.core.etags import CachedBody, make_etag
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+
+def negotiate_media_type(accept: str | None) -> str:
+    # MessagePack only when a client asks for it by name; */* and browsers get JSON
+    if accept:
+        for part in accept.split(","):
+            media_type, _, params = part.partition(";")
+            if media_type.strip() in (MSGPACK, "application/x-msgpack") and params.strip() not in ("q=0", "q=0.0"):
+                return MSGPACK
+    return JSON
+
+def encode_body(adapter: TypeAdapter, value: Any, media_type: str = JSON) -> bytes:
+    if media_type == MSGPACK:
+        return msgpack.packb(adapter.dump_python(value, mode="json"))
+    return adapter.dump_json(value)
+
+def model_response(
+    adapter: TypeAdapter,
+    value: Any,
+    response: Response | None = None,
+    *,
+    validate: bool = True,
+    status_code: int = 200,
+    media_type: str = JSON,
+) -> Any:
+    """Serialize `value` straight to JSON (or MessagePack) bytes with pydantic-core.
+
+    FastAPI's default path validates the returned object against the
+    response model, turns it into plain Python with jsonable_encoder and then
+    runs json.dumps over that. Here the ORM objects are validated once and
+    dumped in one native call. Pass validate=False for values that are
+    already instances of the response model. With FAST_JSON off, JSON values
+    are handed back unchanged and FastAPI serializes them as usual.
+    """
+    if media_type == JSON and not settings.fast_json:
+        return value
+
+    if validate:
+        value = adapter.validate_python(value, from_attributes=True)
+    encoded = Response(encode_body(adapter, value, media_type), status_code=status_code, media_type=media_type)
+    if response is not None:
+        # returning a Response bypasses the injected one, so carry its headers
+        # over as raw pairs; a dict would keep only the last of repeated ones
+        # such as Set-Cookie
+        encoded.raw_headers.extend(response.raw_headers)
+    return encoded
+
+
+class CachedModels:
+    """A validated value and its encoded bodies, each built on first request for its media type."""
+
+    def __init__(self, adapter: TypeAdapter, value: Any):
+        self.adapter = adapter
+        self.value = value
+        self._bodies: dict[str, CachedBody] = {}
+
+    def body(self, media_type: str = JSON) -> CachedBody:
+        cached = self._bodies.get(media_type)
+        if cached is None:
+            body = encode_body(self.adapter, self.value, media_type)
+            cached = self._bodies[media_type] = CachedBody(body, make_etag(body))
+        return cached
@@ -0,0 +1,55 @@
+import logging
+import re
+
+from sqlalchemy import Engine, func, literal_column, or_, text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+from app.models.item import Item
+
+# must match the configuration used by the items.search_vector column
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+_TERM_RE = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+
+def trigram_installed(engine: Engine) -> bool:
+    """Whether the database has pg_trgm, for deciding search_trigram at startup.
+
+    An unreachable database counts as without it: search stays full-text only
+    rather than failing every request once the database is back.
+    """
+    try:
+        with engine.connect() as connection:
+            return connection.execute(
+                text("SELECT EXISTS (SELECT FROM pg_extension WHERE extname = 'pg_trgm')")
+            ).scalar()
+    except DBAPIError:
+        logger.warning("could not check for pg_trgm; item search is full-text only", exc_info=True)
+        return False
+
+
+def prefix_tsquery(q: str):
+    # every term has to match, each one as a prefix so "tas" finds "task"
+    terms = _TERM_RE.findall(q.lower())
+    return func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+
+def item_search_filter(q: str):
+    condition = Item.search_vector.op("@@")(prefix_tsquery(q))
+    if settings.search_trigram:
+        # `column %> q` is word_similarity(q, column) above the pg_trgm
+        # threshold; written this way round it can use the trigram GIN indexes
+        condition = or_(
+            condition,
+            Item.name.op("%>")(q),
+            Item.description.op("%>")(q),
+        )
+    return condition
+
+def item_search_rank(q: str):
+    rank = func.ts_rank(Item.search_vector, prefix_tsquery(q))
+    if settings.search_trigram:
+        rank = rank + func.word_similarity(q, Item.name)
+    return rank
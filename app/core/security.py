@@ -6,14 +6,36 @@ from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_pwd_context: CryptContext | None = None
 
 
+def configure_password_hashing(rounds: int) -> None:
+    """Hash with `rounds`; also the initializer of every hashing worker process."""
+    global _pwd_context
+    # pinning min/max to the configured cost makes needs_update() flag any hash
+    # made with another cost, in either direction
+    _pwd_context = CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+def password_context() -> CryptContext:
+    if _pwd_context is None:
+        configure_password_hashing(settings.bcrypt_rounds)
+    return _pwd_context
+
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    # returns a fresh hash alongside a successful verify when the stored one is outdated
+    return password_context().verify_and_update(plain_password, hashed_password)
 
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     if expires_delta is None:
@@ -2,5 +2,7 @@ from app.db.base import Base
 from app.models.item import Item # noqa: F401
 from app.models.category import Category # noqa: F401
 from app.models.user import User # noqa: F401
+from app.models.job import Job # noqa: F401
+from app.models.item_import import ItemImport # noqa: F401
 from app.models.tag import Tag 
 
@@ -1,10 +1,88 @@
-from typing import Generator
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncGenerator, Callable, Generator, TypeVar
+
+from fastapi.concurrency import contextmanager_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.replicas import use_replica
+from app.db.session import database
+
+T = TypeVar("T")
+
+DbSession = Session | AsyncSession
+
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+def get_sync_db() -> Generator[Session, None, None]:
+    session_factory = database.SessionLocal
+    replicas = database.replicas
+    if use_replica.get() and replicas:
+        if replicas.needs_check():
+            replicas.check()
+        replica = replicas.pick()
+        if replica is not None:
+            session_factory = replica.SessionLocal
+
+    db = session_factory()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    session_factory = database.AsyncSessionLocal
+    replicas = database.replicas
+    if use_replica.get() and replicas:
+        if replicas.needs_check():
+            # a blocking round trip to every replica, kept off the event loop
+            await run_in_threadpool(replicas.check)
+        replica = replicas.pick()
+        if replica is not None:
+            session_factory = replica.AsyncSessionLocal
+
+    async with session_factory() as db:
+        yield db
+
+async def get_db() -> AsyncGenerator[DbSession, None]:
+    # DB_ASYNC is read per request, not at import, so importing the app needs
+    # no settings; the sync session is opened and closed on the threadpool,
+    # as FastAPI does for a sync generator dependency
+    if settings.db_async:
+        async with asynccontextmanager(get_async_db)() as db:
+            yield db
+    else:
+        async with contextmanager_in_threadpool(contextmanager(get_sync_db)()) as db:
+            yield db
+
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run ORM code written against a sync Session on either kind of session.
+
+    An AsyncSession runs it on the event loop, awaiting each statement on the
+    async driver; a plain Session runs it on the threadpool like a sync route.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def is_replica(db: DbSession) -> bool:
+    return db.info.get("replica", False)
+
+
+async def run_on_primary(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Like run_db, on a short-lived primary session of the configured kind.
+
+    For reads that must not miss a row a lagging replica has yet to receive.
+    """
+    if settings.db_async:
+        async with database.AsyncSessionLocal() as db:
+            return await db.run_sync(fn, *args, **kwargs)
+
+    def call() -> T:
+        with database.SessionLocal() as db:
+            return fn(db, *args, **kwargs)
+
+    return await run_in_threadpool(call)
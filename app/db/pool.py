@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection, QueuePool
+
+# upper bounds, in seconds, of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            for index, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[index] += 1
+                    break
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+
+class InstrumentedPoolMixin:
+    """Times every checkout, including waiting for a free connection, opening a new one and the pre-ping."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return connection
+
+    def snapshot(self) -> dict[str, Any]:
+        stats = self.stats
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            # negative while the pool is still filling up to `size`
+            "overflow": max(self.overflow(), 0),
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_seconds_total": stats.wait_seconds_total,
+            "wait_seconds_max": stats.wait_seconds_max,
+            "wait_seconds_buckets": {
+                str(bound): count for bound, count in zip(WAIT_BUCKETS, stats.wait_buckets)
+            },
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
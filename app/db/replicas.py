@@ -0,0 +1,177 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+from app.core.metrics import instrument_engine
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
+# seconds the replica is behind the primary. 0 when it is not a standby, or
+# when it is streaming and has replayed everything it received (an idle
+# primary writes no new transactions to be behind on). A standby whose WAL
+# receiver is down has replayed everything it received too, while the primary
+# moves on, so otherwise the lag is the age of the last replayed transaction
+# and grows until the replica is dropped. Reading the receiver's status needs
+# pg_read_all_stats; without it every standby is measured the second way
+LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()"
+    " AND EXISTS (SELECT FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0"
+    " ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())"
+    " END"
+)
+
+PRIMARY_COOKIE = "atlas_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# set per request by ReplicaRoutingMiddleware; anything outside a request,
+# and every request that may write, uses the primary
+use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+
+class Replica:
+    def __init__(self, url: str, options: dict):
+        self.url = url
+        self.engine = create_engine(url, poolclass=InstrumentedQueuePool, **options)
+        instrument_engine(self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine, info={"replica": True})
+        self.async_engine = create_async_engine(url, poolclass=InstrumentedAsyncQueuePool, **options)
+        instrument_engine(self.async_engine.sync_engine)
+        self.AsyncSessionLocal = async_sessionmaker(
+            autocommit=False, autoflush=False, expire_on_commit=False, bind=self.async_engine, info={"replica": True}
+        )
+        # None until the first check, and whenever the replica cannot be reached
+        self.lag_seconds: float | None = None
+
+    def measure_lag(self) -> float | None:
+        try:
+            with self.engine.connect() as connection:
+                lag = connection.execute(LAG_QUERY).scalar()
+        except DBAPIError:
+            return None
+        return None if lag is None else float(lag)
+
+    def dispose(self, close: bool = True) -> None:
+        self.engine.dispose(close=close)
+        self.async_engine.sync_engine.dispose(close=close)
+
+
+class ReplicaSet:
+    """Read replicas, each used only while its lag is known and small enough.
+
+    Lag is measured lazily by whichever request first finds the last check
+    older than check_interval; the others keep using the previous result
+    instead of waiting for it.
+    """
+
+    def __init__(self, urls: list[str], options: dict, max_lag: float, check_interval: float):
+        self.replicas = [Replica(url, options) for url in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.checked_at: float | None = None
+        self._check_lock = threading.Lock()
+        self._next = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def needs_check(self) -> bool:
+        return bool(self.replicas) and (
+            self.checked_at is None or time.monotonic() - self.checked_at >= self.check_interval
+        )
+
+    def check(self) -> None:
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            for replica in self.replicas:
+                replica.lag_seconds = replica.measure_lag()
+            self.checked_at = time.monotonic()
+        finally:
+            self._check_lock.release()
+
+    def pick(self) -> Replica | None:
+        """A healthy replica, round robin, or None to fall back to the primary."""
+        healthy = [
+            replica for replica in self.replicas
+            if replica.lag_seconds is not None and replica.lag_seconds <= self.max_lag
+        ]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.dispose(close=close)
+
+
+class ReplicaRoutingMiddleware:
+    """Sends safe requests to a replica unless the client wrote recently.
+
+    A successful unsafe request sets a cookie that keeps the client's reads on
+    the primary for `window` seconds, long enough for replicas within the lag
+    limit to catch up. Clients that do not keep cookies are also recognised by
+    their Authorization header, though only by the worker that served the write.
+    """
+
+    def __init__(self, app: ASGIApp, window: float, max_clients: int = 10_000):
+        self.app = app
+        self.window = window
+        self.recent_writers = TTLCache(maxsize=max_clients, ttl=window)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if scope["method"] in SAFE_METHODS:
+            token = use_replica.set(not self.wrote_recently(headers))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                use_replica.reset(token)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self.mark_writer(headers, MutableHeaders(scope=message))
+            await send(message)
+
+        token = use_replica.set(False)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            use_replica.reset(token)
+
+    def wrote_recently(self, headers: Headers) -> bool:
+        authorization = headers.get("authorization")
+        if authorization is not None and self.recent_writers.get(authorization):
+            return True
+
+        cookie = SimpleCookie(headers.get("cookie", "")).get(PRIMARY_COOKIE)
+        try:
+            return cookie is not None and float(cookie.value) > time.time()
+        except ValueError:
+            return False
+
+    def mark_writer(self, request_headers: Headers, response_headers: MutableHeaders) -> None:
+        authorization = request_headers.get("authorization")
+        if authorization is not None:
+            self.recent_writers.set(authorization, True)
+
+        window = int(self.window)
+        response_headers.append(
+            "set-cookie",
+            f"{PRIMARY_COOKIE}={time.time() + window:.0f}; Max-Age={window}; Path=/; HttpOnly; SameSite=Lax",
+        )
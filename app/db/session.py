@@ -1,7 +1,103 @@
-from sqlalchemy import create_engine
+import threading
+
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.db.replicas import ReplicaSet
+
+
+def engine_options() -> dict:
+    return {
+        "pool_pre_ping": True,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        # server-side limits, so a runaway query or a forgotten transaction
+        # cannot hold a pooled connection forever
+        "connect_args": {
+            "options": (
+                f"-c statement_timeout={settings.db_statement_timeout_ms} "
+                f"-c idle_in_transaction_session_timeout={settings.db_idle_in_transaction_timeout_ms}"
+            ),
+        },
+    }
+
+
+class Database:
+    """The primary engines, their session factories and the read replicas.
+
+    None of them exists until first used (or open() is called at startup), so
+    importing the app needs no database settings and opens no pools.
+    """
+
+    engine: Engine
+    SessionLocal: sessionmaker
+    async_engine: AsyncEngine
+    AsyncSessionLocal: async_sessionmaker
+    replicas: ReplicaSet
+
+    def __init__(self) -> None:
+        self.opened = False
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        # only reached for attributes not set yet, i.e. before open()
+        if name.startswith("_") or self.opened:
+            raise AttributeError(name)
+        self.open()
+        return getattr(self, name)
+
+    def open(self) -> None:
+        with self._lock:
+            if self.opened:
+                return
+
+            self.engine = create_engine(settings.database_url, poolclass=InstrumentedQueuePool, **engine_options())
+            instrument_engine(self.engine)
+            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+            # psycopg 3 speaks both protocols, so the same URL drives the async engine
+            self.async_engine = create_async_engine(
+                settings.database_url, poolclass=InstrumentedAsyncQueuePool, **engine_options()
+            )
+            instrument_engine(self.async_engine.sync_engine)
+            # objects handed back to FastAPI are serialized after the session's work is
+            # done, where an async session can no longer lazily reload expired attributes
+            self.AsyncSessionLocal = async_sessionmaker(
+                autocommit=False, autoflush=False, expire_on_commit=False, bind=self.async_engine
+            )
+
+            self.replicas = ReplicaSet(
+                settings.replica_database_urls,
+                engine_options(),
+                max_lag=settings.replica_max_lag_seconds,
+                check_interval=settings.replica_check_interval_seconds,
+            )
+            self.opened = True
+
+    async def close(self) -> None:
+        if not self.opened:
+            return
+        await self.async_engine.dispose()
+        self.engine.dispose()
+        self.replicas.dispose()
+
+    def dispose_after_fork(self) -> None:
+        """Give a freshly forked worker process its own, empty connection pools.
+
+        Connections inherited from the parent share its sockets; close=False
+        drops them from this process's pools without sending a termination
+        message the parent's copies would notice.
+        """
+        if not self.opened:
+            return
+        self.engine.dispose(close=False)
+        self.async_engine.sync_engine.dispose(close=False)
+        self.replicas.dispose(close=False)
 
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+database = Database()
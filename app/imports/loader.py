@@ -0,0 +1,117 @@
+"""Loading a batch of validated rows with COPY and merging it in a few statements.
+
+The batch is copied into a temporary staging table, so names are resolved
+and references checked by joins over the whole batch instead of by lookups per
+row. Item ids are taken from the items sequence as the rows are copied, which
+lets the item_tags links be written straight from the staging table too.
+"""
+from sqlalchemy import (
+    ARRAY, Column, Integer, MetaData, Table, Text, case, delete, exists, func, insert, literal, or_, select,
+    text, true, union,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from app.models.category import Category
+from app.models.item import Item
+from app.models.tag import Tag, item_tags
+from app.schemas.item import ItemImportRow
+
+# kept out of Base.metadata: it exists only inside the transaction loading a batch
+staging_metadata = MetaData()
+
+import_items = Table(
+    "import_items",
+    staging_metadata,
+    Column("row", Integer, nullable=False),
+    # the sequence behind items.id, as both create_all and the migrations name it
+    Column("item_id", Integer, nullable=False, server_default=text("nextval('items_id_seq')")),
+    Column("name", Text, nullable=False),
+    Column("description", Text),
+    Column("category_id", Integer),
+    Column("category", Text),
+    Column("tag_ids", ARRAY(Integer), nullable=False),
+    Column("tags", ARRAY(Text), nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+COPY_COLUMNS = ["row", "name", "description", "category_id", "category", "tag_ids", "tags"]
+
+
+async def copy_async(connection, statement: str, rows: list[tuple]) -> None:
+    async with connection.cursor() as cursor:
+        async with cursor.copy(statement) as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+
+def copy_rows(db: Session, table: Table, columns: list[str], rows: list[tuple]) -> None:
+    """COPY rows into a table on the session's connection, in its transaction."""
+    connection = db.connection()
+    quote = connection.dialect.identifier_preparer.quote
+    statement = f"COPY {quote(table.name)} ({', '.join(map(quote, columns))}) FROM STDIN"
+    driver_connection = connection.connection.driver_connection
+    if connection.dialect.is_async:
+        # run_db runs this inside AsyncSession.run_sync, whose greenlet can
+        # await the async driver directly
+        await_only(copy_async(driver_connection, statement, rows))
+        return
+    with driver_connection.cursor() as cursor, cursor.copy(statement) as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def merge_rows(db: Session, rows: dict[int, ItemImportRow], user_id: int) -> tuple[int, dict[int, str]]:
+    """Create an item for each row whose tags and category exist.
+
+    Returns how many were created and, by row number, why the others were not.
+    """
+    staged = import_items.c
+    import_items.create(db.connection())
+    copy_rows(db, import_items, COPY_COLUMNS, [
+        (row, item.name, item.description, item.category_id, item.category, item.tag_ids, item.tags)
+        for row, item in rows.items()
+    ])
+
+    given_ids = func.unnest(staged.tag_ids).table_valued("tag_id").render_derived(name="given_ids")
+    given_names = func.unnest(staged.tags).table_valued("name").render_derived(name="given_names")
+    unknown_tags = or_(
+        exists(select(given_ids.c.tag_id).where(~exists().where(Tag.id == given_ids.c.tag_id))),
+        exists(select(given_names.c.name).where(~exists().where(Tag.name == given_names.c.name))),
+    )
+    unknown_category = or_(
+        (staged.category_id != None) & ~exists().where(Category.id == staged.category_id),  # noqa: E711
+        (staged.category != None) & ~exists().where(Category.name == staged.category),  # noqa: E711
+    )
+    failures = dict(db.execute(
+        delete(import_items)
+        .where(or_(unknown_tags, unknown_category))
+        .returning(staged.row, case((unknown_tags, "One or more tags not found"), else_="Category not found"))
+    ).all())
+
+    db.execute(
+        insert(Item).from_select(
+            ["id", "name", "description", "category_id", "user_id"],
+            select(
+                staged.item_id,
+                staged.name,
+                staged.description,
+                func.coalesce(staged.category_id, Category.id),
+                literal(user_id),
+            )
+            .select_from(import_items.outerjoin(Category, Category.name == staged.category))
+            .order_by(staged.row),
+        )
+    )
+    # a function in FROM sees the columns of the row it is joined to
+    db.execute(insert(item_tags).from_select(
+        ["item_id", "tag_id"],
+        union(
+            select(staged.item_id, given_ids.c.tag_id).select_from(import_items.join(given_ids, true())),
+            select(staged.item_id, Tag.id).select_from(
+                import_items.join(given_names, true()).join(Tag, Tag.name == given_names.c.name)
+            ),
+        ),
+    ))
+    import_items.drop(db.connection())
+    return len(rows) - len(failures), failures
@@ -0,0 +1,160 @@
+"""Turning an uploaded CSV or NDJSON body into item rows as it arrives.
+
+Every record remembers the bytes it spans in the file, so an import can commit
+up to the end of any record and later resume from exactly there. Nothing here
+holds more than the current chunk and the batch being assembled, and no record
+more than its size limit: a longer one is read past and reported as failed.
+"""
+import csv
+import json
+from typing import AsyncIterator, Literal, NamedTuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.schemas.item import ItemImportRow
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# tags in a CSV cell, as the export joins them
+TAG_SEPARATOR = ";"
+
+item_import_rows = TypeAdapter(list[ItemImportRow])
+
+
+class Record(NamedTuple):
+    # byte offsets in the whole file, end exclusive
+    start: int
+    end: int
+    # None once the record outgrew the size limit; its bytes were dropped
+    data: bytes | None
+
+
+async def skip_bytes(chunks: AsyncIterator[bytes], count: int) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        if count >= len(chunk):
+            count -= len(chunk)
+            continue
+        yield chunk[count:]
+        count = 0
+
+
+async def read_lines(chunks: AsyncIterator[bytes], offset: int, limit: int) -> AsyncIterator[tuple[int, bytes, bool]]:
+    """Yield (offset, bytes, ends the line) for each line of the body.
+
+    A line longer than `limit` is passed on in pieces as it arrives instead.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        end = buffer.rfind(b"\n") + 1
+        if end:
+            for line in bytes(buffer[:end]).split(b"\n")[:-1]:
+                yield offset, line + b"\n", True
+                offset += len(line) + 1
+            del buffer[:end]
+        if len(buffer) > limit:
+            yield offset, bytes(buffer), False
+            offset += len(buffer)
+            buffer.clear()
+    # the last line need not end with a newline
+    if buffer:
+        yield offset, bytes(buffer), True
+
+
+async def read_records(
+    chunks: AsyncIterator[bytes], offset: int, format: ImportFormat, limit: int
+) -> AsyncIterator[Record]:
+    """Yield the non-blank records of the body, which starts `offset` bytes into the file.
+
+    A record longer than `limit` bytes is yielded without its data.
+    """
+    pending = bytearray()
+    start = None
+    quotes = 0
+    oversized = False
+    async for line_start, line, line_ends in read_lines(chunks, offset, limit):
+        if start is None:
+            if line_ends and not line.strip():
+                continue
+            start = line_start
+        end = line_start + len(line)
+        if not oversized:
+            pending += line
+            if len(pending) > limit:
+                oversized = True
+                pending.clear()
+        # a quoted CSV field may span lines: the record ends once its quotes
+        # are balanced, escaped quotes being doubled
+        if format == "csv":
+            quotes += line.count(b'"')
+        if not line_ends or quotes % 2:
+            continue
+        yield Record(start, end, None if oversized else bytes(pending))
+        pending.clear()
+        start = None
+        quotes = 0
+        oversized = False
+    if start is not None:
+        yield Record(start, end, None if oversized else bytes(pending))
+
+
+def parse_header(record: Record) -> list[str]:
+    text = record.data.decode("utf-8-sig", errors="replace")
+    return [column.strip().lower() for column in next(csv.reader([text]))]
+
+
+def parse_records(records: list[Record], format: ImportFormat, columns: list[str] | None) -> list[dict | str]:
+    """The fields of each record, or why it could not be read."""
+    parsed: list[dict | str] = []
+    texts: dict[int, str] = {}
+    for index, record in enumerate(records):
+        if record.data is None:
+            parsed.append("Record is too large")
+            continue
+        try:
+            texts[index] = record.data.decode("utf-8")
+        except UnicodeDecodeError:
+            parsed.append("Not valid UTF-8")
+            continue
+        parsed.append({})
+
+    if format == "csv":
+        # one reader for the whole batch; each text is exactly one record
+        for index, values in zip(texts, csv.reader(texts.values())):
+            fields = dict(zip(columns, values))
+            parsed[index] = {
+                "name": fields.get("name"),
+                "description": fields.get("description") or None,
+                "category": fields.get("category") or None,
+                "tags": [tag.strip() for tag in (fields.get("tags") or "").split(TAG_SEPARATOR) if tag.strip()],
+            }
+        return parsed
+
+    for index, text in texts.items():
+        try:
+            fields = json.loads(text)
+        except json.JSONDecodeError as exc:
+            parsed[index] = f"Invalid JSON: {exc.msg}"
+            continue
+        parsed[index] = fields if isinstance(fields, dict) else "Expected a JSON object"
+    return parsed
+
+
+def validate_rows(parsed: list[dict | str]) -> tuple[dict[int, ItemImportRow], dict[int, str]]:
+    """Validate a batch against ItemImportRow in one pass, keyed by position.
+
+    When some rows fail, the rest go through a second pass, so a bad row costs
+    its batch one more validation rather than every row a call of its own.
+    """
+    failures = {index: fields for index, fields in enumerate(parsed) if isinstance(fields, str)}
+    indexes = [index for index in range(len(parsed)) if index not in failures]
+    try:
+        return dict(zip(indexes, item_import_rows.validate_python([parsed[index] for index in indexes]))), failures
+    except ValidationError as exc:
+        for error in exc.errors(include_url=False):
+            position, *loc = error["loc"]
+            field = ".".join(str(part) for part in loc)
+            failures.setdefault(indexes[position], f"{field}: {error['msg']}" if field else error["msg"])
+
+    indexes = [index for index in indexes if index not in failures]
+    return dict(zip(indexes, item_import_rows.validate_python([parsed[index] for index in indexes]))), failures
@@ -0,0 +1,60 @@
+from typing import Callable
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.models.job import Job
+
+
+class JobError(Exception):
+    """Fails the job; the message is shown to its owner."""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobInterrupted(Exception):
+    """The worker is shutting down; the job goes back to the queue."""
+
+
+class JobLost(Exception):
+    """Another worker claimed the job after this one's heartbeat went stale."""
+
+
+class JobContext:
+    def __init__(
+        self, db: Session, job_id: int, attempt: int, user_id: int, progress_done: int, stopping: Callable[[], bool]
+    ):
+        self.db = db
+        self.job_id = job_id
+        # the claim this worker holds; a later claim_job() counts another
+        self.attempt = attempt
+        # the job's owner; handlers touch only their items
+        self.user_id = user_id
+        # progress made by earlier attempts, for handlers resuming their work
+        self.progress_done = progress_done
+        self.stopping = stopping
+
+    def report(self, done: int, total: int | None = None) -> None:
+        """Record progress and commit it together with the batch it describes.
+
+        Raises JobCancelled once the owner has asked to cancel and
+        JobInterrupted when the worker is shutting down. Raises JobLost,
+        rolling the batch back, if the job was claimed again meanwhile.
+        """
+        cancel_requested = self.db.execute(
+            update(Job)
+            .where(Job.id == self.job_id, Job.attempts == self.attempt, Job.status == "running")
+            .values(progress=done, total=total, heartbeat_at=func.now())
+            .returning(Job.cancel_requested)
+        ).scalar_one_or_none()
+        if cancel_requested is None:
+            self.db.rollback()
+            raise JobLost
+        self.db.commit()
+
+        if cancel_requested:
+            raise JobCancelled
+        if self.stopping():
+            raise JobInterrupted
@@ -0,0 +1,130 @@
+"""What each kind of background job does.
+
+A handler works in batches of settings.job_batch_size and reports progress
+after each one, which commits the batch. Work committed before a cancellation
+or shutdown stays done, so handlers pick up whatever is left when run again.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from pydantic import BaseModel
+from sqlalchemy import delete, exists, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.caches import tags_cache
+from app.core.config import settings
+from app.jobs.context import JobContext, JobError
+from app.models.category import Category
+from app.models.item import Item
+from app.models.tag import Tag, item_tags
+from app.schemas.job import MergeTagsParams, MoveCategoryItemsParams
+
+
+def merge_tags(ctx: JobContext, params: MergeTagsParams) -> dict[str, Any]:
+    """Move the owner's links to the source tag over to the target tag.
+
+    The source tag is deleted once no other user's items link to it either.
+    """
+    db = ctx.db
+    found = db.scalars(select(Tag.id).where(Tag.id.in_([params.source_tag_id, params.target_tag_id]))).all()
+    if len(found) != 2:
+        raise JobError("Tag not found")
+
+    owned = select(item_tags.c.item_id).join(Item, Item.id == item_tags.c.item_id).where(
+        item_tags.c.tag_id == params.source_tag_id, Item.user_id == ctx.user_id
+    )
+    remaining = db.scalar(select(func.count()).select_from(owned.subquery()))
+    done = ctx.progress_done
+    total = done + remaining
+    while True:
+        item_ids = db.scalars(
+            owned
+            .order_by(item_tags.c.item_id)
+            .limit(settings.job_batch_size)
+        ).all()
+        if not item_ids:
+            break
+
+        db.execute(
+            pg_insert(item_tags)
+            .from_select(
+                ["item_id", "tag_id"],
+                select(Item.id, literal(params.target_tag_id))
+                .where(Item.id.in_(item_ids), Item.user_id == ctx.user_id),
+            )
+            .on_conflict_do_nothing()
+        )
+        db.execute(
+            delete(item_tags)
+            .where(item_tags.c.tag_id == params.source_tag_id, item_tags.c.item_id.in_(item_ids))
+        )
+        db.execute(
+            update(Item)
+            .where(Item.id.in_(item_ids), Item.user_id == ctx.user_id)
+            .values(version=Item.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        done += len(item_ids)
+        ctx.report(done, total)
+
+    deleted = db.execute(
+        delete(Tag)
+        .where(Tag.id == params.source_tag_id, ~exists().where(item_tags.c.tag_id == Tag.id))
+        .returning(Tag.id)
+    ).scalar_one_or_none()
+    db.commit()
+    if deleted is not None:
+        tags_cache.bump()
+    return {"merged_items": done}
+
+
+def move_category_items(ctx: JobContext, params: MoveCategoryItemsParams) -> dict[str, Any]:
+    """Move the owner's items in the source category to the target category (or none)."""
+    db = ctx.db
+    category_ids = [params.source_category_id]
+    if params.target_category_id is not None:
+        category_ids.append(params.target_category_id)
+    found = db.scalars(select(Category.id).where(Category.id.in_(category_ids))).all()
+    if len(found) != len(set(category_ids)):
+        raise JobError("Category not found")
+    if params.target_category_id == params.source_category_id:
+        return {"moved_items": 0}
+
+    remaining = db.scalar(
+        select(func.count()).where(Item.category_id == params.source_category_id, Item.user_id == ctx.user_id)
+    )
+    done = ctx.progress_done
+    total = done + remaining
+    while True:
+        batch = (
+            select(Item.id)
+            .where(Item.category_id == params.source_category_id, Item.user_id == ctx.user_id)
+            .order_by(Item.id)
+            .limit(settings.job_batch_size)
+            .scalar_subquery()
+        )
+        moved = db.execute(
+            update(Item)
+            .where(Item.id.in_(batch), Item.user_id == ctx.user_id)
+            .values(category_id=params.target_category_id, version=Item.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not moved:
+            break
+
+        done += moved
+        ctx.report(done, total)
+
+    return {"moved_items": done}
+
+
+@dataclass(frozen=True)
+class JobKind:
+    params: type[BaseModel]
+    run: Callable[[JobContext, Any], dict[str, Any] | None]
+
+
+JOB_KINDS: dict[str, JobKind] = {
+    "tags.merge": JobKind(MergeTagsParams, merge_tags),
+    "categories.move_items": JobKind(MoveCategoryItemsParams, move_category_items),
+}
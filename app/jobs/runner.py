@@ -0,0 +1,154 @@
+"""Background jobs, run on a bounded pool of threads in every worker process.
+
+Jobs are rows in Postgres. A worker thread claims the oldest queued one with
+FOR UPDATE SKIP LOCKED, so any number of threads and processes can share the
+queue without handing out a job twice. A running job whose heartbeat is older
+than settings.job_stale_seconds is taken to have died with its process and is
+claimed again.
+"""
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Callable
+
+from sqlalchemy import Row, and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import database
+from app.jobs.context import JobCancelled, JobContext, JobError, JobInterrupted, JobLost
+from app.jobs.handlers import JOB_KINDS
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = ("queued", "running")
+
+
+def claim_job(db: Session) -> Row | None:
+    candidate = (
+        select(Job.id)
+        .where(
+            Job.status.in_(UNFINISHED),
+            or_(
+                Job.status == "queued",
+                and_(Job.status == "running", Job.heartbeat_at < func.now() - timedelta(seconds=settings.job_stale_seconds)),
+            ),
+        )
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    job = db.execute(
+        update(Job)
+        .where(Job.id == candidate)
+        .values(
+            status="running",
+            started_at=func.coalesce(Job.started_at, func.now()),
+            heartbeat_at=func.now(),
+            attempts=Job.attempts + 1,
+        )
+        .returning(Job.id, Job.user_id, Job.kind, Job.params, Job.attempts, Job.progress, Job.cancel_requested)
+    ).one_or_none()
+    db.commit()
+    return job
+
+
+def finish_job(
+    db: Session, job: Row, status: str, result: dict[str, Any] | None = None, error: str | None = None
+) -> None:
+    # only while the job is still this claim's; see JobLost
+    db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.attempts == job.attempts)
+        .values(status=status, result=result, error=error, finished_at=func.now())
+    )
+    db.commit()
+
+
+def run_job(db: Session, job: Row, stopping: Callable[[], bool] = lambda: False) -> None:
+    """Run a claimed job to its end, or until it is cancelled or the worker stops."""
+    job_id = job.id
+    try:
+        kind = JOB_KINDS.get(job.kind)
+        if kind is None:
+            raise JobError(f"Unknown job kind: {job.kind}")
+        if job.attempts > settings.job_max_attempts:
+            raise JobError(f"Gave up after {settings.job_max_attempts} attempts")
+        if job.cancel_requested:
+            raise JobCancelled
+        ctx = JobContext(db, job_id, job.attempts, job.user_id, job.progress, stopping)
+        result = kind.run(ctx, kind.params.model_validate(job.params))
+    except JobCancelled:
+        db.rollback()
+        finish_job(db, job, "cancelled")
+    except JobInterrupted:
+        db.rollback()
+        # a shutdown is no failed attempt: give back the one claim_job counted
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.attempts == job.attempts)
+            .values(status="queued", heartbeat_at=None, attempts=Job.attempts - 1)
+        )
+        db.commit()
+    except JobLost:
+        # a batch outlasted job_stale_seconds; the worker now holding the job
+        # carries on from the last committed one
+        logger.warning("job %s (%s) was claimed again by another worker", job_id, job.kind)
+    except JobError as exc:
+        db.rollback()
+        finish_job(db, job, "failed", error=str(exc))
+    except Exception:
+        logger.exception("job %s (%s) failed", job_id, job.kind)
+        db.rollback()
+        finish_job(db, job, "failed", error="Internal error")
+    else:
+        finish_job(db, job, "succeeded", result=result)
+
+
+class JobRunner:
+    def __init__(self) -> None:
+        self._threads: list[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+
+    def start(self, workers: int, poll_interval: float) -> None:
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._work, args=(poll_interval,), name=f"job-worker-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop claiming jobs; running ones are queued again at their next progress report."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        # a job was just enqueued in this process; don't wait for the next poll
+        self._wakeup.set()
+
+    def _work(self, poll_interval: float) -> None:
+        while not self._stopping.is_set():
+            job = None
+            try:
+                with database.SessionLocal() as db:
+                    job = claim_job(db)
+                    if job is not None:
+                        run_job(db, job, self._stopping.is_set)
+            except Exception:
+                # most likely the database is unreachable; try again after a pause
+                logger.exception("job worker error")
+
+            if job is None:
+                self._wakeup.wait(poll_interval)
+                self._wakeup.clear()
+
+
+job_runner = JobRunner()
@@ -1,10 +1,123 @@
-from fastapi import FastAPI
-from app.core.config import settings
-from app.api.router import api_router
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 
-app = FastAPI(title=settings.app_name)
-app.include_router(api_router)
+from app.core import config
+from app.core.config import Settings
 
-@app.get("/health")
-def health_check():
-    return {"status": "ok"}
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+
+def create_app(settings: Settings | None = None) -> "FastAPI":
+    """Build the application, with `settings` or else the environment's.
+
+    Importing this module stays cheap: the framework, the route modules and the
+    middleware are imported here, and the database engines and pools only come
+    into being when the app starts or a request first needs them.
+    """
+    if settings is not None:
+        config.settings.configure(settings)
+    settings = config.settings.get()
+
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+    from starlette.concurrency import run_in_threadpool
+
+    from app.api.deps import token_cache, user_cache
+    from app.api.router import api_router
+    from app.core.admission import AdmissionMiddleware, admission_capacity, build_gates, render_admission
+    from app.core.caches import categories_cache, tags_cache
+    from app.core.compression import CompressionMiddleware
+    from app.core.hashing import hashing_pool
+    from app.core.metrics import MetricsMiddleware, render_metrics
+    from app.core.search import trigram_installed
+    from app.core.security import configure_password_hashing
+    from app.db.replicas import ReplicaRoutingMiddleware
+    from app.db.session import database
+    from app.jobs.runner import job_runner
+
+    # process-wide objects the route modules share; set here rather than at
+    # import, so that every create_app() call applies its own settings
+    configure_password_hashing(settings.bcrypt_rounds)
+    hashing_pool.configure(
+        workers=settings.password_hash_workers,
+        max_pending=settings.password_hash_max_pending,
+        rounds=settings.bcrypt_rounds,
+    )
+    for auth_cache in (token_cache, user_cache):
+        auth_cache.configure(maxsize=settings.auth_cache_max_entries, ttl=settings.auth_cache_ttl_seconds)
+    for list_cache in (categories_cache, tags_cache):
+        list_cache.configure(ttl=settings.list_cache_ttl_seconds)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        database.open()
+        if settings.search_trigram is None:
+            settings.search_trigram = await run_in_threadpool(trigram_installed, database.engine)
+        if settings.job_workers:
+            job_runner.start(settings.job_workers, settings.job_poll_interval_seconds)
+        yield
+        # running jobs are queued again for another worker to finish
+        await run_in_threadpool(job_runner.stop, settings.web_graceful_timeout_seconds)
+        hashing_pool.shutdown()
+        await database.close()
+
+    # per worker process, like the connection pools they share out
+    admission_gates = build_gates(settings.admission_limits, admission_capacity(settings))
+
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_bytes,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+    if settings.replica_database_urls:
+        app.add_middleware(ReplicaRoutingMiddleware, window=settings.replica_read_your_writes_seconds)
+    # outside compression and replica routing, so a refused request costs neither
+    app.add_middleware(
+        AdmissionMiddleware,
+        gates=admission_gates,
+        routes=settings.admission_routes,
+        retry_after=settings.admission_retry_after_seconds,
+    )
+    # added last so it is outermost and its latency includes compression
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(api_router)
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "ok"}
+
+    def pool_snapshots() -> dict[str, dict]:
+        pools = {
+            "sync": database.engine.pool.snapshot(),
+            "async": database.async_engine.sync_engine.pool.snapshot(),
+        }
+        for index, replica in enumerate(database.replicas.replicas):
+            pools[f"replica{index}_sync"] = replica.engine.pool.snapshot()
+            pools[f"replica{index}_async"] = replica.async_engine.sync_engine.pool.snapshot()
+        return pools
+
+    @app.get("/health/pool")
+    async def pool_status():
+        return pool_snapshots()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(
+            render_metrics(pool_snapshots()) + render_admission(admission_gates),
+            media_type="text/plain; version=0.0.4",
+        )
+
+    return app
+
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` and `from app.main import app` build the default
+    # app on first access rather than on import
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,18 @@
-from sqlalchemy import String, Text, ForeignKey
+from sqlalchemy import String, Text, ForeignKey, Index, Computed, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 from app.models.tag import item_tags
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # serves both "all items of a user" and keyset pagination ordered by id
+        Index("ix_items_user_id_id", "user_id", "id"),
+        Index("ix_items_search_vector", "search_vector", postgresql_using="gin"),
+        # the pg_trgm GIN indexes on name and description live in the
+        # migrations only, since they need the extension to be installed
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
@@ -17,9 +25,22 @@ class Item(Base):
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"),
         nullable=False,
-        index=True,
     )
+    # bumped by every write to the item, its tags, or the category and tags
+    # it points at; served as the ETag
+    version: Mapped[int] = mapped_column(nullable=False, server_default=text("1"))
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
 
+    __mapper_args__ = {"version_id_col": version}
 
     category = relationship("Category", back_populates="items")
     owner = relationship("User", back_populates="items")
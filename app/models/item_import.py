@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class ItemImport(Base):
+    __tablename__ = "item_imports"
+    __table_args__ = (
+        Index("ix_item_imports_user_id_id", "user_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    format: Mapped[str] = mapped_column(String(10), nullable=False)
+    # the CSV header, so an upload resumed past it still knows the columns
+    columns: Mapped[list[str] | None] = mapped_column(JSONB, nullable=True)
+    # bytes of the file loaded and committed so far, always at the end of a
+    # row; a resumed upload carries on from here
+    byte_offset: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    rows: Mapped[int] = mapped_column(nullable=False, server_default=text("0"))
+    created: Mapped[int] = mapped_column(nullable=False, server_default=text("0"))
+    failed: Mapped[int] = mapped_column(nullable=False, server_default=text("0"))
+    # the first settings.item_import_max_errors failed rows
+    errors: Mapped[list[dict]] = mapped_column(JSONB, nullable=False, server_default=text("'[]'::jsonb"))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=text("now()"))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=text("now()"))
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # workers claim the oldest unfinished job; finished ones, the bulk of
+        # the table over time, stay out of the index
+        Index("ix_jobs_unfinished_id", "id", postgresql_where=text("status IN ('queued', 'running')")),
+        Index("ix_jobs_user_id_id", "user_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    params: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    # queued -> running -> succeeded | failed | cancelled; a running job goes
+    # back to queued when its worker shuts down before it is done
+    status: Mapped[str] = mapped_column(String(20), nullable=False, server_default=text("'queued'"))
+    progress: Mapped[int] = mapped_column(nullable=False, server_default=text("0"))
+    total: Mapped[int | None] = mapped_column(nullable=True)
+    result: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("false"))
+    attempts: Mapped[int] = mapped_column(nullable=False, server_default=text("0"))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=text("now()"))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # refreshed with every progress report, so a job whose worker died can be told apart
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Table, Column, ForeignKey
+from sqlalchemy import String, Table, Column, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
@@ -7,6 +7,8 @@ item_tags = Table(
     Base.metadata,
     Column("item_id", ForeignKey("items.id"), primary_key=True),
     Column("tag_id", ForeignKey("tags.id"), primary_key=True),
+    # the primary key serves lookups by item; this serves lookups by tag
+    Index("ix_item_tags_tag_id_item_id", "tag_id", "item_id"),
 )
 
 class Tag(Base):
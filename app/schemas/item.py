@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field
+from datetime import datetime
+
+from pydantic import BaseModel, Field, model_validator
 from app.schemas.tag import TagRead
 from app.schemas.category import CategoryRead
 
@@ -18,6 +20,46 @@ class ItemUpdate(ItemBase):
     category_id : int | None = None
     tag_ids: list[int] | None = None
 
+class ItemBulkUpdate(ItemUpdate):
+    id: int
+
+class ItemBulkResult(BaseModel):
+    index: int
+    id: int | None = None
+    status_code: int
+    detail: str | None = None
+
+class ItemImportRow(ItemCreate):
+    # the category and tags may also be given by name, as the CSV export
+    # writes them; the import resolves names to ids
+    category: str | None = None
+    tags: list[str] = []
+
+    @model_validator(mode="after")
+    def one_category(self) -> "ItemImportRow":
+        if self.category is not None and self.category_id is not None:
+            raise ValueError("Give either category_id or category")
+        return self
+
+class ItemImportError(BaseModel):
+    row: int
+    offset: int
+    detail: str
+
+class ItemImportRead(BaseModel):
+    id: int
+    format: str
+    offset: int
+    rows: int
+    created: int
+    failed: int
+    errors: list[ItemImportError]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class ItemRead(ItemBase):
     id : int
     tags: list[TagRead] = []
@@ -25,3 +67,14 @@ class ItemRead(ItemBase):
 
     class Config:
         from_attributes = True
+
+
+class ItemFacetCount(BaseModel):
+    id: int
+    name: str
+    count: int
+
+class ItemFacets(BaseModel):
+    total: int
+    categories: list[ItemFacetCount]
+    tags: list[ItemFacetCount]
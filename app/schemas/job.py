@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, Field, model_validator
+
+class JobCreate(BaseModel):
+    kind: str
+    params: dict[str, Any] = {}
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    params: dict[str, Any]
+    status: str
+    progress: int
+    total: int | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    cancel_requested: bool
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class MergeTagsParams(BaseModel):
+    source_tag_id: int
+    target_tag_id: int
+
+    @model_validator(mode="after")
+    def distinct_tags(self) -> "MergeTagsParams":
+        if self.source_tag_id == self.target_tag_id:
+            raise ValueError("source_tag_id and target_tag_id must differ")
+        return self
+
+class MoveCategoryItemsParams(BaseModel):
+    source_category_id: int
+    # None leaves the items without a category
+    target_category_id: int | None = Field(default=None)
@@ -0,0 +1,76 @@
+"""Production entrypoint: gunicorn supervising uvicorn workers.
+
+    python -m app.server
+
+The app is imported once in the master and the workers fork from it, so
+start-up cost is paid once and the code pages are shared. Each worker then
+builds its own connection pools after the fork. `kill -HUP` on the master
+replaces the workers one by one, letting in-flight requests finish within
+WEB_GRACEFUL_TIMEOUT_SECONDS.
+"""
+import math
+import os
+from pathlib import Path
+from typing import Any
+
+from gunicorn.app.base import BaseApplication
+
+from app.core.config import settings
+
+CGROUP_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup v2 quota (docker --cpus)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        quota, period = CGROUP_CPU_MAX.read_text().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    from app.db.session import database
+
+    database.dispose_after_fork()
+
+
+def gunicorn_options() -> dict[str, Any]:
+    return {
+        "bind": f"{settings.web_host}:{settings.web_port}",
+        "workers": settings.web_workers or available_cpus(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "post_fork": post_fork,
+        "max_requests": settings.web_max_requests,
+        "max_requests_jitter": settings.web_max_requests_jitter,
+        "timeout": settings.web_timeout_seconds,
+        "graceful_timeout": settings.web_graceful_timeout_seconds,
+        "accesslog": "-",
+    }
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import create_app
+
+        return create_app()
+
+
+if __name__ == "__main__":
+    Server(gunicorn_options()).run()
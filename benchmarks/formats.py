@@ -0,0 +1,68 @@
+"""Bytes on the wire and server CPU for each response format and encoding.
+
+    python -m benchmarks.formats
+
+Encodes one synthetic page of 100 items, shaped like GET /items/?limit=100,
+as JSON and MessagePack, each sent as is, gzipped and brotli-compressed with
+the levels from settings. No database is needed.
+"""
+import statistics
+import time
+
+from app.core.compression import compress_body
+from app.core.config import settings
+from app.core.responses import JSON, MSGPACK, encode_body
+from app.api.routes.items import item_list
+from app.schemas.category import CategoryRead
+from app.schemas.item import ItemRead
+from app.schemas.tag import TagRead
+from benchmarks.seed import WORDS
+
+PAGE_SIZE = 100
+ROUNDS = 7
+ENCODES_PER_ROUND = 200
+
+
+def build_page() -> list[ItemRead]:
+    tags = [TagRead(id=index, name=f"tag {index}") for index in range(1, 21)]
+    categories = [CategoryRead(id=index, name=f"category {index}") for index in range(1, 11)]
+    page = []
+    for index in range(1, PAGE_SIZE + 1):
+        category = categories[index % len(categories)]
+        word = lambda step: WORDS[(index // step) % len(WORDS)]
+        page.append(ItemRead(
+            id=index,
+            name=f"{word(1)} {word(7)} {index}",
+            description=f"A {word(3)} item for the {word(11)} collection",
+            category_id=category.id,
+            category=category,
+            tags=[tags[(index * 31 + offset) % len(tags)] for offset in range(3)],
+        ))
+    return page
+
+
+def cpu_per_encode(page: list[ItemRead], media_type: str, encoding: str | None) -> float:
+    start = time.process_time()
+    for _ in range(ENCODES_PER_ROUND):
+        body = encode_body(item_list, page, media_type)
+        if encoding is not None:
+            compress_body(body, encoding, settings.compression_gzip_level, settings.compression_brotli_quality)
+    return (time.process_time() - start) / ENCODES_PER_ROUND
+
+
+def main() -> None:
+    page = build_page()
+    print(f"{'format':<22}{'bytes':>9}{'CPU us':>10}")
+    for media_type in (JSON, MSGPACK):
+        body = encode_body(item_list, page, media_type)
+        for encoding in (None, "gzip", "br"):
+            size = len(body) if encoding is None else len(compress_body(
+                body, encoding, settings.compression_gzip_level, settings.compression_brotli_quality
+            ))
+            cpu = statistics.median(cpu_per_encode(page, media_type, encoding) for _ in range(ROUNDS))
+            label = media_type.removeprefix("application/") + (f" + {encoding}" if encoding else "")
+            print(f"{label:<22}{size:>9}{cpu * 1e6:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measure what MetricsMiddleware and the engine hooks add to every request.
+
+    python -m benchmarks.metrics_overhead
+
+Runs against DATABASE_URL and prints the median cost per request and per
+statement with and without instrumentation.
+"""
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, RequestStats, current_request, instrument_engine
+
+ROUNDS = 7
+REQUESTS_PER_ROUND = 5_000
+STATEMENTS_PER_ROUND = 2_000
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def time_requests(app: FastAPI) -> float:
+    scope = {
+        "type": "http", "method": "GET", "path": "/items/1", "raw_path": b"/items/1",
+        "query_string": b"", "headers": [], "http_version": "1.1", "scheme": "http",
+        "server": ("bench", 80), "client": ("bench", 1), "root_path": "", "app": app,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS_PER_ROUND):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / REQUESTS_PER_ROUND
+
+
+def time_statements(instrumented: bool) -> float:
+    engine = create_engine(settings.database_url)
+    if instrumented:
+        instrument_engine(engine)
+    token = current_request.set(RequestStats() if instrumented else None)
+    try:
+        with engine.connect() as connection:
+            start = time.perf_counter()
+            for _ in range(STATEMENTS_PER_ROUND):
+                connection.execute(text("SELECT 1"))
+            return (time.perf_counter() - start) / STATEMENTS_PER_ROUND
+    finally:
+        current_request.reset(token)
+        engine.dispose()
+
+
+def main() -> None:
+    apps = {False: build_app(False), True: build_app(True)}
+    requests = {False: [], True: []}
+    statements = {False: [], True: []}
+    # interleave the variants so drift on a noisy machine hits both equally
+    for _ in range(ROUNDS):
+        for instrumented in (False, True):
+            requests[instrumented].append(asyncio.run(time_requests(apps[instrumented])))
+            statements[instrumented].append(time_statements(instrumented))
+
+    for label, samples in (("request", requests), ("statement", statements)):
+        bare = statistics.median(samples[False]) * 1e6
+        instrumented = statistics.median(samples[True]) * 1e6
+        print(f"{label:<10} bare {bare:8.1f} us   instrumented {instrumented:8.1f} us   "
+              f"overhead {instrumented - bare:+7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Drive the ASGI app with a concurrent endpoint mix and gate on a baseline.
+
+    python -m benchmarks.run                    # seed, run, compare to baseline.json
+    python -m benchmarks.run --save-baseline    # record a new baseline
+    python -m benchmarks.run --no-seed --requests 5000 --concurrency 32
+
+Requests go through httpx's ASGI transport, so the whole stack runs
+(middleware, dependencies, serialization, the real database) without a
+network hop. The app runs on BENCHMARK_DATABASE_URL, a disposable database
+of its own: seeding truncates every table. Latency depends on the machine,
+so a baseline only gates runs on the machine that recorded it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import event
+
+from app.core.security import create_access_token
+from app.db.session import database
+from app.main import create_app
+from benchmarks.seed import WORDS, Dataset, benchmark_settings, seed, user_email
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+# latency is compared with a relative tolerance plus an absolute floor, so
+# sub-millisecond jitter on fast endpoints cannot fail the gate
+DEFAULT_TOLERANCE = 0.25
+LATENCY_FLOOR_MS = 2.0
+QUERY_TOLERANCE = 0.1
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    weight: int
+    method: str
+    # builds (path, json body) from the per-user state and a random source
+    build: Callable[["Session", random.Random], tuple[str, dict | None]]
+
+
+@dataclass
+class Session:
+    dataset: Dataset
+    user_id: int
+    headers: dict[str, str]
+
+    def item_id(self, rng: random.Random) -> int:
+        return rng.choice(self.dataset.item_ids(self.user_id))
+
+
+ENDPOINTS = (
+    Endpoint("list_items", 30, "GET", lambda s, rng: ("/items/?limit=20", None)),
+    Endpoint("filter_items", 10, "GET", lambda s, rng: (
+        f"/items/?limit=20&category_id={rng.randint(1, s.dataset.categories)}", None,
+    )),
+    Endpoint("search_items", 15, "GET", lambda s, rng: (f"/items/?limit=20&q={rng.choice(WORDS)}", None)),
+    Endpoint("get_item", 25, "GET", lambda s, rng: (f"/items/{s.item_id(rng)}", None)),
+    Endpoint("list_categories", 5, "GET", lambda s, rng: ("/categories/", None)),
+    Endpoint("list_tags", 5, "GET", lambda s, rng: ("/tags/", None)),
+    Endpoint("create_item", 5, "POST", lambda s, rng: ("/items/", {
+        "name": f"{rng.choice(WORDS)} new item",
+        "category_id": rng.randint(1, s.dataset.categories),
+        "tag_ids": rng.sample(range(1, s.dataset.tags + 1), s.dataset.tags_per_item),
+    })),
+    Endpoint("update_item", 5, "PUT", lambda s, rng: (
+        f"/items/{s.item_id(rng)}", {"name": f"{rng.choice(WORDS)} renamed item"},
+    )),
+)
+
+# statements executed on behalf of the request currently being timed
+request_queries: ContextVar[list[int] | None] = ContextVar("request_queries", default=None)
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def machine() -> dict[str, str | int]:
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()}
+
+
+async def run_load(app: FastAPI, dataset: Dataset, total_requests: int, concurrency: int, seed_value: int) -> dict:
+    sessions = [
+        Session(dataset, user_id, {"Authorization": f"Bearer {create_access_token(subject=user_email(user_id))}"})
+        for user_id in range(1, dataset.users + 1)
+    ]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    queries: dict[str, int] = defaultdict(int)
+    errors: dict[str, int] = defaultdict(int)
+    failures: dict[str, str] = {}
+    remaining = total_requests
+
+    async def worker(client: httpx.AsyncClient, rng: random.Random) -> None:
+        nonlocal remaining
+        weights = [endpoint.weight for endpoint in ENDPOINTS]
+        while remaining > 0:
+            remaining -= 1
+            endpoint = rng.choices(ENDPOINTS, weights)[0]
+            session = rng.choice(sessions)
+            path, body = endpoint.build(session, rng)
+
+            counter = [0]
+            token = request_queries.set(counter)
+            started_at = time.perf_counter()
+            try:
+                response = await client.request(endpoint.method, path, json=body, headers=session.headers)
+                failure = f"HTTP {response.status_code}" if response.status_code >= 400 else None
+            except Exception as exc:
+                # the app raised: a failed request of this endpoint, not the end of the run
+                failure = f"{type(exc).__name__}: {exc}"
+            finally:
+                elapsed = time.perf_counter() - started_at
+                request_queries.reset(token)
+
+            latencies[endpoint.name].append(elapsed * 1000)
+            queries[endpoint.name] += counter[0]
+            if failure is not None:
+                errors[endpoint.name] += 1
+                failures.setdefault(endpoint.name, failure)
+
+    transport = httpx.ASGITransport(app=app)
+    # startup decides what the settings leave to the database, as in production
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, random.Random(seed_value + index)) for index in range(concurrency)
+        ))
+        wall_seconds = time.perf_counter() - started_at
+
+    for name, failure in failures.items():
+        print(f"{name}: {errors[name]} requests failed, the first with {failure}", file=sys.stderr)
+
+    results = {}
+    for endpoint in ENDPOINTS:
+        values = sorted(latencies[endpoint.name])
+        if not values:
+            continue
+        results[endpoint.name] = {
+            "requests": len(values),
+            "errors": errors[endpoint.name],
+            "p50_ms": round(percentile(values, 0.50), 3),
+            "p95_ms": round(percentile(values, 0.95), 3),
+            "p99_ms": round(percentile(values, 0.99), 3),
+            "queries_per_request": round(queries[endpoint.name] / len(values), 3),
+        }
+    return {
+        "machine": machine(),
+        "dataset": dataset.as_dict(),
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / wall_seconds, 1),
+        "endpoints": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return one message per regression; an empty list means the run passed."""
+    if report["dataset"] != baseline["dataset"] or report["concurrency"] != baseline["concurrency"]:
+        return ["dataset or concurrency differ from the baseline, the runs are not comparable"]
+
+    regressions = []
+    for name, current in report["endpoints"].items():
+        if current["errors"]:
+            regressions.append(f"{name}: {current['errors']} requests failed")
+        previous = baseline["endpoints"].get(name)
+        if previous is None:
+            continue
+        # query counts barely move between runs (only cold caches add a few),
+        # so anything beyond that noise is a real regression
+        if current["queries_per_request"] > previous["queries_per_request"] + QUERY_TOLERANCE:
+            regressions.append(
+                f"{name}: {current['queries_per_request']} queries per request, "
+                f"baseline {previous['queries_per_request']}"
+            )
+        limit = max(previous["p95_ms"] * (1 + tolerance), previous["p95_ms"] + LATENCY_FLOOR_MS)
+        if current["p95_ms"] > limit:
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms, baseline {previous['p95_ms']}ms")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['requests']} requests, concurrency {report['concurrency']}, "
+          f"{report['throughput_rps']} req/s")
+    print(f"{'endpoint':<16}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, row in report["endpoints"].items():
+        print(f"{name:<16}{row['requests']:>9}{row['errors']:>8}{row['p50_ms']:>10.2f}"
+              f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['queries_per_request']:>9.2f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    defaults = Dataset()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--items-per-user", type=int, default=defaults.items_per_user)
+    parser.add_argument("--categories", type=int, default=defaults.categories)
+    parser.add_argument("--tags", type=int, default=defaults.tags)
+    parser.add_argument("--tags-per-item", type=int, default=defaults.tags_per_item)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the request mix")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data already in the database")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", type=Path, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    dataset = Dataset(args.users, args.items_per_user, args.categories, args.tags, args.tags_per_item)
+    app = create_app(benchmark_settings())
+    if not args.no_seed:
+        seed(database.engine, dataset)
+
+    for target in (database.engine, database.async_engine.sync_engine):
+        event.listen(target, "after_cursor_execute", count_query)
+
+    report = asyncio.run(run_load(app, dataset, args.requests, args.concurrency, args.seed))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}, run with --save-baseline first")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("machine") != report["machine"]:
+        print(f"note: the baseline was recorded on {baseline.get('machine')}; latency may not be comparable")
+    regressions = compare(report, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
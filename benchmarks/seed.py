@@ -0,0 +1,108 @@
+"""Fill the database with a synthetic dataset for the load benchmark.
+
+Everything is generated server-side with generate_series, so seeding a few
+hundred thousand items takes seconds rather than minutes. Seeding truncates
+every table, so it only ever runs against BENCHMARK_DATABASE_URL and refuses
+a database holding users the benchmarks did not create.
+"""
+import os
+from dataclasses import asdict, dataclass
+
+from pydantic import ValidationError
+from sqlalchemy import Engine, inspect, text
+from sqlalchemy.engine import make_url
+
+from app.core.config import Settings
+from app.core.security import get_password_hash
+from app.db.base import Base
+
+PASSWORD = "benchmark-password"
+WORDS = (
+    "red", "green", "blue", "amber", "violet", "silver", "copper", "ivory",
+    "garden", "kitchen", "office", "travel", "winter", "summer", "vintage", "compact",
+)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    users: int = 20
+    items_per_user: int = 500
+    categories: int = 20
+    tags: int = 50
+    tags_per_item: int = 3
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+    def item_ids(self, user_id: int) -> range:
+        # ids are deterministic because every seed restarts the sequences
+        first = (user_id - 1) * self.items_per_user + 1
+        return range(first, first + self.items_per_user)
+
+
+def user_email(user_id: int) -> str:
+    return f"bench{user_id}@example.com"
+
+
+def database_key(url: str) -> tuple:
+    url = make_url(url)
+    return url.host or "localhost", url.port or 5432, url.database
+
+
+def benchmark_settings() -> Settings:
+    """The environment's settings with the database swapped for BENCHMARK_DATABASE_URL."""
+    url = os.getenv("BENCHMARK_DATABASE_URL")
+    if not url:
+        raise SystemExit("set BENCHMARK_DATABASE_URL to a disposable database: seeding truncates every table")
+    try:
+        app_url = Settings().database_url
+    except ValidationError:
+        app_url = None
+    if app_url is not None and database_key(app_url) == database_key(url):
+        raise SystemExit("BENCHMARK_DATABASE_URL must not name the same database as DATABASE_URL")
+    return Settings(database_url=url)
+
+
+def seed(engine: Engine, dataset: Dataset) -> None:
+    if dataset.tags_per_item > dataset.tags:
+        raise ValueError("tags_per_item cannot exceed the number of tags")
+
+    with engine.connect() as connection:
+        if inspect(connection).has_table("users") and connection.execute(
+            text("SELECT EXISTS (SELECT FROM users WHERE email NOT LIKE 'bench%@example.com')")
+        ).scalar():
+            raise RuntimeError(f"{engine.url.database} holds users of its own; refusing to truncate it")
+
+    Base.metadata.create_all(bind=engine)
+    words = "ARRAY[" + ", ".join(f"'{word}'" for word in WORDS) + "]"
+    params = dataset.as_dict() | {"hashed_password": get_password_hash(PASSWORD)}
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            "TRUNCATE item_tags, items, tags, categories, users RESTART IDENTITY CASCADE"
+        ))
+        connection.execute(text(
+            "INSERT INTO users (email, hashed_password, is_active) "
+            "SELECT 'bench' || g || '@example.com', :hashed_password, true "
+            "FROM generate_series(1, :users) g"
+        ), params)
+        connection.execute(text(
+            "INSERT INTO categories (name) SELECT 'category ' || g FROM generate_series(1, :categories) g"
+        ), params)
+        connection.execute(text(
+            "INSERT INTO tags (name) SELECT 'tag ' || g FROM generate_series(1, :tags) g"
+        ), params)
+        connection.execute(text(
+            "INSERT INTO items (name, description, category_id, user_id) "
+            f"SELECT ({words})[1 + g % {len(WORDS)}] || ' ' || ({words})[1 + (g / 7) % {len(WORDS)}] || ' ' || g, "
+            f"'A ' || ({words})[1 + (g / 3) % {len(WORDS)}] || ' item for the ' "
+            f"|| ({words})[1 + (g / 11) % {len(WORDS)}] || ' collection', "
+            "1 + g % :categories, 1 + (g - 1) / :items_per_user "
+            "FROM generate_series(1, :users * :items_per_user) g"
+        ), params)
+        connection.execute(text(
+            "INSERT INTO item_tags (item_id, tag_id) "
+            "SELECT items.id, 1 + (items.id * 31 + k) % :tags "
+            "FROM items CROSS JOIN generate_series(0, :tags_per_item - 1) k"
+        ), params)
+        connection.execute(text("ANALYZE"))
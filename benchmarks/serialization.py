@@ -0,0 +1,98 @@
+"""Compare CPU per response with FAST_JSON on and off.
+
+    python -m benchmarks.serialization
+
+Seeds a small dataset (truncating BENCHMARK_DATABASE_URL, as benchmarks.run
+does) and measures two things: the serialization step alone on an already
+loaded page of 100 items, and full GET /items/ requests through the ASGI app.
+CPU time is measured for this process only, so database work on the server
+side does not blur the comparison.
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.api.routes.items import item_list, item_query
+from app.core.config import settings
+from app.core.responses import model_response
+from app.core.security import create_access_token
+from app.db.session import database
+from app.main import create_app
+from benchmarks.seed import Dataset, benchmark_settings, seed, user_email
+
+ROUNDS = 7
+REQUESTS_PER_ROUND = 100
+SERIALIZATIONS_PER_ROUND = 200
+PAGE_SIZE = 100
+
+
+async def cpu_per_serialization(fast_json: bool, items: list, field) -> float:
+    start = time.process_time()
+    for _ in range(SERIALIZATIONS_PER_ROUND):
+        if fast_json:
+            model_response(item_list, items).body
+        else:
+            # what FastAPI does with a returned list and response_model=list[ItemRead]
+            JSONResponse(await serialize_response(field=field, response_content=items)).body
+    return (time.process_time() - start) / SERIALIZATIONS_PER_ROUND
+
+
+async def measure_serialization(app: FastAPI) -> dict[bool, list[float]]:
+    route = next(
+        route for route in app.routes
+        if isinstance(route, APIRoute) and route.path == "/items/" and "GET" in route.methods
+    )
+    with database.SessionLocal() as db:
+        items = item_query(db).order_by("id").limit(PAGE_SIZE).all()
+
+    samples: dict[bool, list[float]] = {False: [], True: []}
+    settings.fast_json = True
+    for _ in range(ROUNDS):
+        for fast_json in (False, True):
+            samples[fast_json].append(await cpu_per_serialization(fast_json, items, route.response_field))
+    return samples
+
+
+async def cpu_per_response(client: httpx.AsyncClient, headers: dict[str, str]) -> float:
+    start = time.process_time()
+    for _ in range(REQUESTS_PER_ROUND):
+        response = await client.get("/items/", params={"limit": PAGE_SIZE}, headers=headers)
+        response.raise_for_status()
+    return (time.process_time() - start) / REQUESTS_PER_ROUND
+
+
+async def measure_requests(app: FastAPI) -> dict[bool, list[float]]:
+    headers = {"Authorization": f"Bearer {create_access_token(subject=user_email(1))}"}
+    samples: dict[bool, list[float]] = {False: [], True: []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await cpu_per_response(client, headers)
+        # interleave the variants so drift on a noisy machine hits both equally
+        for _ in range(ROUNDS):
+            for fast_json in (False, True):
+                settings.fast_json = fast_json
+                samples[fast_json].append(await cpu_per_response(client, headers))
+    return samples
+
+
+def main() -> None:
+    app = create_app(benchmark_settings())
+    seed(database.engine, Dataset(users=1, items_per_user=PAGE_SIZE * 2, categories=10, tags=20, tags_per_item=3))
+    for label, measure in (
+        (f"serialize {PAGE_SIZE} items", measure_serialization),
+        (f"GET /items/?limit={PAGE_SIZE}", measure_requests),
+    ):
+        samples = asyncio.run(measure(app))
+        default = statistics.median(samples[False]) * 1000
+        fast = statistics.median(samples[True]) * 1000
+        print(f"{label:<24} default {default:6.2f} ms CPU   fast_json {fast:6.2f} ms CPU   "
+              f"({(1 - fast / default) * 100:.0f}% less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,19 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT_DIR))
 
 import os
+from contextlib import contextmanager
+
 import pytest
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
+from app.core.config import Settings
 from app.db.base import Base
 from app.db import base_class
+from app.main import create_app
 
 
 load_dotenv()
@@ -21,14 +26,31 @@ test_db_url = os.getenv("TEST_DATABASE_URL")
 if not test_db_url:
     raise RuntimeError("TEST_DATABASE_URL is not set")
 
-os.environ["DATABASE_URL"] = test_db_url
-
 engine = create_engine(test_db_url, pool_pre_ping=True)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# the cheapest bcrypt cost keeps the many register/login calls fast
+settings = Settings(database_url=test_db_url, bcrypt_rounds=4)
+app = create_app(settings)
 
-from app.main import app  # noqa: E402
+from app.core.metrics import instrument_engine  # noqa: E402
 from app.db.deps import get_db  # noqa: E402
+from app.api.deps import token_cache, user_cache  # noqa: E402
+from app.core.caches import categories_cache, tags_cache  # noqa: E402
+
+instrument_engine(engine)
+
+def install_trigram_extension() -> bool:
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError:
+        return False
+    return True
+
+# typo-tolerant search needs pg_trgm; without it only full-text search runs
+trigram_available = install_trigram_extension()
+settings.search_trigram = trigram_available
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
@@ -36,6 +58,15 @@ def setup_database():
     yield
     Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # every test rolls its data back, so anything cached by one test is stale in the next
+    yield
+    token_cache.clear()
+    user_cache.clear()
+    categories_cache.bump()
+    tags_cache.bump()
+
 @pytest.fixture(scope="function")
 def db_session():
     connection = engine.connect()
@@ -82,3 +113,25 @@ def auth_client(client, auth_headers):
     client.headers.update(auth_headers)
     yield client
     client.headers.pop("Authorization", None)
+
+@pytest.fixture()
+def count_queries():
+    @contextmanager
+    def counter():
+        statements: list[str] = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
+@pytest.fixture()
+def trigram():
+    if not trigram_available:
+        pytest.skip("pg_trgm extension is not installed")
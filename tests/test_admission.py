@@ -0,0 +1,162 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.admission import AdmissionGate, AdmissionMiddleware, admission_capacity, build_gates
+from app.core.config import AdmissionLimit, Settings, settings
+
+
+def test_gate_queues_then_refuses():
+    async def main():
+        gate = AdmissionGate(concurrency=1, queue=1, queue_timeout=5)
+        assert await gate.acquire()
+
+        queued = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.queued == 1
+        # the queue is full, so this one is refused without waiting
+        assert not await gate.acquire()
+        assert gate.rejected == 1
+
+        gate.release()
+        assert await queued
+        assert (gate.active, gate.queued) == (1, 0)
+        gate.release()
+        assert gate.active == 0
+
+    asyncio.run(main())
+
+
+def test_gate_serves_waiters_in_arrival_order():
+    async def main():
+        gate = AdmissionGate(concurrency=1, queue=5, queue_timeout=5)
+        await gate.acquire()
+        order = []
+
+        async def request(name):
+            await gate.acquire()
+            order.append(name)
+            gate.release()
+
+        tasks = [asyncio.create_task(request(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(*tasks)
+        return order, gate.active
+
+    assert asyncio.run(main()) == (["a", "b", "c"], 0)
+
+
+def test_gate_gives_up_after_queue_timeout():
+    async def main():
+        gate = AdmissionGate(concurrency=1, queue=1, queue_timeout=0.01)
+        await gate.acquire()
+        assert not await gate.acquire()
+        return gate.queued, gate.rejected
+
+    assert asyncio.run(main()) == (0, 1)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        gate = AdmissionGate(concurrency=1, queue=1, queue_timeout=5)
+        await gate.acquire()
+        queued = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        assert gate.queued == 0
+        gate.release()
+        return gate.active
+
+    assert asyncio.run(main()) == 0
+
+
+def test_gates_admit_no_more_than_the_pool_serves():
+    gates = build_gates(settings.admission_limits, 15)
+    assert sum(gate.concurrency for gate in gates.values()) == 15
+    assert gates["default"].concurrency == 15 - 2 - 2
+
+    # groups of their own take what they ask for; the default still runs one
+    assert build_gates(settings.admission_limits, 4)["default"].concurrency == 1
+
+
+def test_capacity_leaves_connections_for_jobs_and_ungated_work():
+    defaults = Settings(database_url="postgresql+psycopg://x@localhost/x", secret_key="x")
+    assert admission_capacity(defaults) == 5 + 10 - 2 - 2
+
+    no_jobs = defaults.model_copy(update={"job_workers": 0, "admission_reserved_connections": 0})
+    assert admission_capacity(no_jobs) == 15
+
+
+def test_routes_resolve_to_groups():
+    middleware = AdmissionMiddleware(
+        FastAPI(), build_gates(settings.admission_limits, 1), settings.admission_routes, retry_after=1
+    )
+
+    assert middleware.group("GET", "/health") == "unlimited"
+    assert middleware.group("GET", "/health/pool") == "unlimited"
+    assert middleware.group("GET", "/categories/") == "unlimited"
+    assert middleware.group("GET", "/tags/") == "unlimited"
+    assert middleware.group("POST", "/categories/") == "default"
+    assert middleware.group("GET", "/categories/1") == "default"
+    assert middleware.group("GET", "/items/export") == "export"
+    assert middleware.group("GET", "/items/") == "default"
+    assert middleware.group("POST", "/items/import/3") == "import"
+    assert middleware.group("GET", "/items/import/3") == "default"
+
+
+def test_routes_must_name_configured_groups():
+    with pytest.raises(ValueError, match="reports"):
+        AdmissionMiddleware(FastAPI(), build_gates(settings.admission_limits, 1), {"/reports*": "reports"}, 1)
+
+
+def test_full_queue_is_shed_with_503():
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    gates = build_gates({"default": AdmissionLimit(concurrency=1, queue=1, queue_timeout_seconds=5)}, 1)
+    app.add_middleware(AdmissionMiddleware, gates=gates, routes={"/health": "unlimited"}, retry_after=3)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            running = asyncio.create_task(client.get("/slow"))
+            queued = asyncio.create_task(client.get("/slow"))
+            while gates["default"].queued < 1:
+                await asyncio.sleep(0.001)
+
+            shed = await client.get("/slow")
+            health = await client.get("/health")
+
+            release.set()
+            return shed, health, await running, await queued
+
+    shed, health, running, queued = asyncio.run(main())
+
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "3"
+    assert health.status_code == 200
+    assert running.status_code == 200
+    assert queued.status_code == 200
+    assert gates["default"].active == 0
+
+
+def test_metrics_report_admission_gates(client):
+    body = client.get("/metrics").text
+
+    assert 'atlas_admission_active{group="default"}' in body
+    assert 'atlas_admission_rejected_total{group="export"}' in body
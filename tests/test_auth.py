@@ -1,3 +1,12 @@
+import asyncio
+
+from passlib.context import CryptContext
+
+from app.api.deps import user_cache
+from app.core.hashing import HashingPool, hashing_pool
+from app.core.security import get_password_hash, password_context
+from app.models.user import User
+
 def test_register_user(client):
     response = client.post(
         "/auth/register",
@@ -36,4 +45,73 @@ def test_me_with_auth(client):
 
     response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
-    assert response.json()["email"] == "me@example.com"
\ No newline at end of file
+    assert response.json()["email"] == "me@example.com"
+
+def test_me_is_served_from_auth_cache(auth_client, count_queries):
+    auth_client.get("/auth/me")
+
+    with count_queries() as statements:
+        response = auth_client.get("/auth/me")
+    assert response.status_code == 200
+    assert statements == []
+
+def test_deactivated_user_is_rejected(auth_client, db_session):
+    assert auth_client.get("/auth/me").status_code == 200
+
+    user = db_session.query(User).filter(User.email == "test@example.com").one()
+    user.is_active = False
+    db_session.commit()
+
+    response = auth_client.get("/auth/me")
+    assert response.status_code == 401
+
+def test_cached_user_is_dropped_at_commit_not_at_flush(auth_client, db_session):
+    auth_client.get("/auth/me")
+    user = db_session.query(User).filter(User.email == "test@example.com").one()
+    user.is_active = False
+    db_session.flush()
+    # until the commit, other requests still read the active row
+    assert user_cache.get("test@example.com") is not None
+
+    db_session.commit()
+    assert user_cache.get("test@example.com") is None
+    assert auth_client.get("/auth/me").status_code == 401
+
+def test_user_loaded_before_an_invalidation_is_not_cached(auth_client):
+    generation = user_cache.generation
+    stale = User(email="test@example.com", hashed_password="x", is_active=True)
+    user_cache.pop("test@example.com")
+    user_cache.set("test@example.com", stale, generation=generation)
+    assert user_cache.get("test@example.com") is None
+
+def test_login_upgrades_outdated_password_hash(client, db_session):
+    client.post("/auth/register", json={"email": "rehash@example.com", "password": "password123"})
+    user = db_session.query(User).filter(User.email == "rehash@example.com").one()
+    user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("password123")
+    db_session.commit()
+
+    response = client.post("/auth/login", data={"username": "rehash@example.com", "password": "password123"})
+    assert response.status_code == 200
+
+    db_session.refresh(user)
+    assert password_context().identify(user.hashed_password) == "bcrypt"
+    assert not password_context().needs_update(user.hashed_password)
+
+def test_login_fails_fast_when_hashing_pool_is_full(client, monkeypatch):
+    client.post("/auth/register", json={"email": "busy@example.com", "password": "password123"})
+    monkeypatch.setattr(hashing_pool, "max_pending", 0)
+
+    response = client.post("/auth/login", data={"username": "busy@example.com", "password": "password123"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_hashing_workers_take_their_cost_from_the_pool(monkeypatch):
+    # the workers start without the settings this process was given
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.delenv("SECRET_KEY", raising=False)
+    pool = HashingPool(workers=1, max_pending=1, rounds=5)
+    try:
+        hashed = asyncio.run(pool.run(get_password_hash, "password123"))
+    finally:
+        pool.shutdown()
+    assert hashed.startswith("$2b$05$")
@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks.run import compare, percentile
+from benchmarks.seed import benchmark_settings
+
+
+def report(p95_ms: float, queries: float, errors: int = 0) -> dict:
+    return {
+        "dataset": {"users": 1},
+        "concurrency": 4,
+        "endpoints": {
+            "list_items": {"p95_ms": p95_ms, "queries_per_request": queries, "errors": errors},
+        },
+    }
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0
+
+
+def test_compare_passes_within_tolerance():
+    assert compare(report(11.0, 2.0), report(10.0, 2.0), tolerance=0.25) == []
+
+
+def test_compare_flags_latency_query_and_error_regressions():
+    regressions = compare(report(20.0, 3.0, errors=1), report(10.0, 2.0), tolerance=0.25)
+    assert len(regressions) == 3
+
+
+def test_compare_refuses_different_datasets():
+    other = report(10.0, 2.0) | {"concurrency": 8}
+    assert len(compare(report(10.0, 2.0), other, tolerance=0.25)) == 1
+
+
+def test_benchmarks_need_a_database_of_their_own(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql+psycopg://app@db.internal/atlas")
+    monkeypatch.delenv("BENCHMARK_DATABASE_URL", raising=False)
+    with pytest.raises(SystemExit):
+        benchmark_settings()
+
+    monkeypatch.setenv("BENCHMARK_DATABASE_URL", "postgresql+psycopg://bench@db.internal:5432/atlas")
+    with pytest.raises(SystemExit):
+        benchmark_settings()
+
+    monkeypatch.setenv("BENCHMARK_DATABASE_URL", "postgresql+psycopg://bench@db.internal/atlas_bench")
+    assert benchmark_settings().database_url.endswith("/atlas_bench")
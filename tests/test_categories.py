@@ -61,4 +61,41 @@ def test_delete_category(auth_client):
     assert response.status_code == 200
 
     get_response = auth_client.get(f"/categories/{category_id}")
-    assert get_response.status_code == 404
\ No newline at end of file
+    assert get_response.status_code == 404
+
+def test_delete_category_in_use_uncategorizes_items(auth_client, count_queries):
+    category = auth_client.post("/categories/", json={"name": "work"}).json()
+    item = auth_client.post("/items/", json={"name": "Task", "category_id": category["id"]}).json()
+
+    with count_queries() as statements:
+        response = auth_client.delete(f"/categories/{category['id']}")
+    assert response.json() == category
+    assert len(statements) == 2
+
+    assert auth_client.get(f"/items/{item['id']}").json()["category"] is None
+    assert auth_client.delete(f"/categories/{category['id']}").status_code == 404
+
+def test_list_categories_is_cached_until_a_write(auth_client, count_queries):
+    auth_client.post("/categories/", json={"name": "work"})
+    first = auth_client.get("/categories/")
+
+    with count_queries() as statements:
+        second = auth_client.get("/categories/")
+    assert statements == []
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+    auth_client.post("/categories/", json={"name": "personal"})
+    third = auth_client.get("/categories/")
+    assert {c["name"] for c in third.json()} == {"work", "personal"}
+    assert third.headers["ETag"] != first.headers["ETag"]
+
+def test_list_categories_not_modified(auth_client, count_queries):
+    auth_client.post("/categories/", json={"name": "work"})
+    etag = auth_client.get("/categories/").headers["ETag"]
+
+    with count_queries() as statements:
+        response = auth_client.get("/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert statements == []
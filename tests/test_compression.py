@@ -0,0 +1,91 @@
+import gzip
+import zlib
+
+import brotli
+import msgpack
+
+from app.core.compression import negotiate_encoding
+from app.core.etags import etag_versions
+
+
+def create_items(auth_client, count):
+    auth_client.post(
+        "/items/bulk",
+        json=[{"name": f"Item {i}", "description": "a fairly repetitive description"} for i in range(count)],
+    )
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0") is None
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding(None) is None
+
+
+def test_large_list_is_compressed(auth_client):
+    create_items(auth_client, 50)
+
+    for encoding, decompress in (("gzip", gzip.decompress), ("br", brotli.decompress)):
+        headers = {"Accept-Encoding": encoding}
+        with auth_client.stream("GET", "/items/", params={"limit": 50}, headers=headers) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["Content-Encoding"] == encoding
+        assert int(response.headers["Content-Length"]) == len(raw)
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert len(decompress(raw)) > len(raw)
+
+
+def test_compressed_body_has_its_own_etag(auth_client):
+    for index in range(60):
+        auth_client.post("/tags/", json={"name": f"tag number {index}"})
+
+    identity = auth_client.get("/tags/", headers={"Accept-Encoding": "identity"}).headers["ETag"]
+    compressed = auth_client.get("/tags/", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] == identity[:-1] + '-gzip"'
+
+    headers = {"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]}
+    not_modified = auth_client.get("/tags/", headers=headers)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == compressed.headers["ETag"]
+
+    # the version inside a suffixed tag still satisfies If-Match
+    assert etag_versions('"3-br", W/"4"') == {3}
+
+
+def test_small_response_is_not_compressed(auth_client):
+    response = auth_client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+    response = auth_client.get("/items/", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streamed_export_is_compressed(auth_client):
+    create_items(auth_client, 30)
+
+    with auth_client.stream("GET", "/items/export", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    lines = zlib.decompress(raw, 31).decode().splitlines()
+    assert len(lines) == 30
+
+
+def test_list_endpoints_speak_msgpack(auth_client):
+    create_items(auth_client, 3)
+    auth_client.post("/tags/", json={"name": "urgent"})
+
+    for path in ("/items/", "/tags/"):
+        as_json = auth_client.get(path)
+        as_msgpack = auth_client.get(path, headers={"Accept": "application/msgpack"})
+        assert as_msgpack.headers["content-type"] == "application/msgpack"
+        assert "Accept" in as_msgpack.headers["Vary"]
+        assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+
+    etag = auth_client.get("/tags/", headers={"Accept": "application/msgpack"}).headers["ETag"]
+    assert etag != auth_client.get("/tags/").headers["ETag"]
+    not_modified = auth_client.get("/tags/", headers={"Accept": "application/msgpack", "If-None-Match": etag})
+    assert not_modified.status_code == 304
@@ -0,0 +1,24 @@
+from sqlalchemy import text
+
+from app.db.session import database
+
+
+def test_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+def test_pool_status_reports_checkouts(client):
+    before = client.get("/health/pool").json()["sync"]
+
+    with database.engine.connect() as connection:
+        timeout = connection.execute(text("SHOW statement_timeout")).scalar()
+        during = client.get("/health/pool").json()["sync"]
+
+    after = client.get("/health/pool").json()["sync"]
+    assert timeout == "30s"
+    assert during["checked_out"] == before["checked_out"] + 1
+    assert after["checked_out"] == before["checked_out"]
+    assert after["checkouts"] == before["checkouts"] + 1
+    assert after["idle"] >= 1
+    assert sum(after["wait_seconds_buckets"].values()) == after["checkouts"]
@@ -0,0 +1,133 @@
+import json
+
+from app.core.config import settings
+
+
+def ndjson(*rows) -> bytes:
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+
+def chunked(body: bytes, size: int):
+    return (body[start:start + size] for start in range(0, len(body), size))
+
+
+def item_names(client) -> list[str]:
+    return [item["name"] for item in client.get("/items/", params={"limit": 100}).json()]
+
+
+def test_import_ndjson_resolves_names_and_reports_rows(auth_client, monkeypatch):
+    monkeypatch.setattr(settings, "item_import_batch_size", 2)
+    category = auth_client.post("/categories/", json={"name": "work"}).json()
+    urgent = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    auth_client.post("/tags/", json={"name": "later"})
+    body = ndjson(
+        {"name": "By name", "category": "work", "tags": ["urgent", "later"]},
+        {"name": "By id", "category_id": category["id"], "tag_ids": [urgent["id"]], "tags": ["urgent"]},
+        {"name": ""},
+        {"name": "Unknown tag", "tags": ["urgent", "nope"]},
+        {"name": "Unknown category", "category": "play"},
+    ) + b"\n" + b"{not json\n" + ndjson({"name": "Last", "description": "no newline"}).rstrip(b"\n")
+
+    response = auth_client.post("/items/import", content=chunked(body, 7))
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["offset"], result["rows"], result["created"], result["failed"]) == (len(body), 7, 3, 4)
+    assert [(error["row"], error["detail"]) for error in result["errors"]] == [
+        (3, "name: String should have at least 1 character"),
+        (4, "One or more tags not found"),
+        (5, "Category not found"),
+        (6, "Invalid JSON: Expecting property name enclosed in double quotes"),
+    ]
+    # offsets point at the start of the failed row, past the blank line
+    assert body[result["errors"][3]["offset"]:].startswith(b"{not json")
+
+    items = {item["name"]: item for item in auth_client.get("/items/").json()}
+    assert list(items) == ["By name", "By id", "Last"]
+    assert items["By name"]["category"]["name"] == "work"
+    assert sorted(tag["name"] for tag in items["By name"]["tags"]) == ["later", "urgent"]
+    assert [tag["name"] for tag in items["By id"]["tags"]] == ["urgent"]
+    assert items["Last"]["description"] == "no newline"
+    assert auth_client.get(f"/items/import/{result['id']}").json() == result
+
+
+def test_exported_csv_imports_as_is(auth_client):
+    category = auth_client.post("/categories/", json={"name": "work"}).json()
+    tags = [auth_client.post("/tags/", json={"name": name}).json() for name in ("a", "b")]
+    auth_client.post("/items/", json={
+        "name": "Report, Q3",
+        "description": 'Two "quoted"\nlines',
+        "category_id": category["id"],
+        "tag_ids": [tag["id"] for tag in tags],
+    })
+    auth_client.post("/items/", json={"name": "Plain"})
+    exported = auth_client.get("/items/export", params={"format": "csv"}).content
+
+    result = auth_client.post("/items/import", params={"format": "csv"}, content=chunked(exported, 5)).json()
+    assert (result["rows"], result["created"], result["failed"]) == (2, 2, 0)
+
+    items = auth_client.get("/items/").json()
+    assert [item["name"] for item in items] == ["Report, Q3", "Plain"] * 2
+    copy = items[2]
+    assert copy["description"] == 'Two "quoted"\nlines'
+    assert copy["category"]["name"] == "work"
+    assert sorted(tag["name"] for tag in copy["tags"]) == ["a", "b"]
+
+
+def test_oversized_records_fail_without_being_buffered(auth_client, monkeypatch):
+    monkeypatch.setattr(settings, "item_import_max_record_bytes", 40)
+    long_name = "x" * 100
+    body = ndjson({"name": "Short"}, {"name": long_name}, {"name": "After"})
+    result = auth_client.post("/items/import", content=chunked(body, 7)).json()
+
+    assert (result["rows"], result["created"], result["failed"]) == (3, 2, 1)
+    assert [(error["row"], error["detail"]) for error in result["errors"]] == [(2, "Record is too large")]
+    assert body[result["errors"][0]["offset"]:].startswith(b'{"name": "xxx')
+
+    # a quoted field running over several lines counts as one record
+    body = b'name,description\nShort,\nLong,"' + b"line\n" * 20 + b'"\nAfter,\n'
+    result = auth_client.post("/items/import", params={"format": "csv"}, content=chunked(body, 7)).json()
+    assert (result["offset"], result["rows"], result["failed"]) == (len(body), 3, 1)
+    assert item_names(auth_client) == ["Short", "After"] * 2
+
+    header = b"name," + b"x" * 100 + b"\n"
+    assert auth_client.post("/items/import", params={"format": "csv"}, content=header).status_code == 413
+
+
+def test_csv_import_needs_a_name_column(auth_client):
+    response = auth_client.post("/items/import", params={"format": "csv"}, content=b"title,tags\nx,y\n")
+    assert response.status_code == 400
+
+
+def test_import_resumes_from_committed_offset(auth_client, client):
+    body = b"name,tags\n" + b"".join(f"Item {index},\n".encode() for index in range(6))
+    cut = body.index(b"Item 3")
+
+    # only the first three rows arrive
+    first = auth_client.post("/items/import", params={"format": "csv"}, content=body[:cut]).json()
+    assert (first["offset"], first["rows"]) == (cut, 3)
+
+    path = f"/items/import/{first['id']}"
+    assert auth_client.post(path, params={"offset": cut + 1}, content=b"").status_code == 409
+    # sending the whole file again skips what was loaded already
+    resumed = auth_client.post(path, params={"offset": 0}, content=body).json()
+    assert (resumed["offset"], resumed["rows"], resumed["created"]) == (len(body), 6, 6)
+    assert item_names(auth_client) == [f"Item {index}" for index in range(6)]
+
+    again = auth_client.post(path, params={"offset": len(body)}, content=b"").json()
+    assert again["rows"] == 6
+    assert [row["id"] for row in auth_client.get("/items/import").json()] == [first["id"]]
+
+    client.post("/auth/register", json={"email": "other@example.com", "password": "password123"})
+    token = client.post(
+        "/auth/login", data={"username": "other@example.com", "password": "password123"}
+    ).json()["access_token"]
+    assert client.get(path, headers={"Authorization": f"Bearer {token}"}).status_code == 404
+
+
+def test_import_keeps_only_the_first_errors(auth_client, monkeypatch):
+    monkeypatch.setattr(settings, "item_import_batch_size", 2)
+    monkeypatch.setattr(settings, "item_import_max_errors", 3)
+    result = auth_client.post("/items/import", content=ndjson(*[{"name": ""}] * 5)).json()
+
+    assert result["failed"] == 5
+    assert [error["row"] for error in result["errors"]] == [1, 2, 3]
@@ -1,3 +1,16 @@
+import asyncio
+import csv
+import io
+import json
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import text
+
+from app.api.routes import items as items_routes
+from app.core.config import Settings
+from app.core.responses import model_response
+from conftest import app, settings, trigram_available
 
 def create_category(auth_client, name="work"):
     response = auth_client.post("/categories/", json={"name": name})
@@ -86,6 +99,52 @@ def test_search_items(auth_client):
     assert len(data) == 1
     assert data[0]["name"] == "Alpha task"
 
+def test_search_items_matches_prefix_and_description(auth_client):
+    auth_client.post("/items/", json={"name": "Groceries", "description": "buy oat milk"})
+    auth_client.post("/items/", json={"name": "Laundry", "description": "whites only"})
+
+    by_prefix = auth_client.get("/items/", params={"q": "groc"}).json()
+    assert [item["name"] for item in by_prefix] == ["Groceries"]
+
+    by_description = auth_client.get("/items/", params={"q": "oat milk"}).json()
+    assert [item["name"] for item in by_description] == ["Groceries"]
+
+def test_search_items_sorted_by_relevance(auth_client):
+    auth_client.post("/items/", json={"name": "Notes", "description": "deploy checklist"})
+    auth_client.post("/items/", json={"name": "Deploy", "description": "ship it"})
+
+    response = auth_client.get("/items/", params={"q": "deploy", "sort": "relevance"})
+    assert response.status_code == 200
+    # a match in the name outranks a match in the description
+    assert [item["name"] for item in response.json()] == ["Deploy", "Notes"]
+
+def test_search_items_relevance_rejects_cursor(auth_client):
+    response = auth_client.get("/items/", params={"q": "x", "sort": "relevance", "cursor": "abc"})
+    assert response.status_code == 400
+
+def test_search_items_tolerates_typos(auth_client, trigram):
+    auth_client.post("/items/", json={"name": "Quarterly report", "description": "x"})
+
+    data = auth_client.get("/items/", params={"q": "quartrly"}).json()
+    assert [item["name"] for item in data] == ["Quarterly report"]
+
+def test_search_by_default_follows_the_database_extensions(auth_client, monkeypatch):
+    # as a server started with default settings decides it
+    monkeypatch.setattr(settings, "search_trigram", Settings.model_fields["search_trigram"].default)
+    monkeypatch.setattr(settings, "job_workers", 0)
+
+    async def start_and_stop():
+        async with app.router.lifespan_context(app):
+            pass
+
+    asyncio.run(start_and_stop())
+    assert settings.search_trigram is trigram_available
+
+    auth_client.post("/items/", json={"name": "Quarterly report"})
+    for path in ("/items/", "/items/facets", "/items/export"):
+        assert auth_client.get(path, params={"q": "quarterly"}).status_code == 200
+    assert auth_client.get("/items/", params={"q": "quarterly", "count": "estimated"}).status_code == 200
+
 def test_filter_items_by_category(auth_client):
     work = create_category(auth_client, name="work")
     personal = create_category(auth_client, name="personal")
@@ -106,6 +165,47 @@ def test_filter_items_by_category(auth_client):
     assert len(data) == 1
     assert data[0]["name"] == "Work task"
 
+def test_item_facets(auth_client, count_queries):
+    work = create_category(auth_client, "work")
+    home = create_category(auth_client, "home")
+    urgent = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    later = auth_client.post("/tags/", json={"name": "later"}).json()
+    for name, category, tag_ids in [
+        ("Report", work, [urgent["id"]]),
+        ("Review", work, [urgent["id"], later["id"]]),
+        ("Garden", home, [later["id"]]),
+        ("Loose", None, []),
+    ]:
+        auth_client.post("/items/", json={
+            "name": name,
+            "category_id": category and category["id"],
+            "tag_ids": tag_ids,
+        })
+
+    with count_queries() as statements:
+        response = auth_client.get("/items/facets")
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert response.json() == {
+        "total": 4,
+        "categories": [
+            {"id": work["id"], "name": "work", "count": 2},
+            {"id": home["id"], "name": "home", "count": 1},
+        ],
+        "tags": [
+            {"id": urgent["id"], "name": "urgent", "count": 2},
+            {"id": later["id"], "name": "later", "count": 2},
+        ],
+    }
+
+    filtered = auth_client.get("/items/facets", params={"tag_ids": [later["id"]]}).json()
+    assert filtered["total"] == 2
+    assert filtered["categories"] == [
+        {"id": work["id"], "name": "work", "count": 1},
+        {"id": home["id"], "name": "home", "count": 1},
+    ]
+    assert {tag["name"]: tag["count"] for tag in filtered["tags"]} == {"urgent": 1, "later": 2}
+
 def test_list_items_pagination(auth_client):
     for i in range(5):
         auth_client.post("/items/", json={"name": f"Task {i}", "description": "x"})
@@ -197,10 +297,361 @@ def test_update_item_tags(auth_client):
     tag_names = {t["name"] for t in response.json()["tags"]}
     assert tag_names == {"urgent", "backend"}
 
+def test_update_item_tags_writes_only_the_difference(auth_client, db_session):
+    urgent, backend, later = (
+        auth_client.post("/tags/", json={"name": name}).json() for name in ("urgent", "backend", "later")
+    )
+    item = auth_client.post(
+        "/items/", json={"name": "Item", "tag_ids": [urgent["id"], backend["id"]]}
+    ).json()
+
+    def link_locations():
+        rows = db_session.execute(
+            text("SELECT tag_id, ctid::text FROM item_tags WHERE item_id = :item_id"), {"item_id": item["id"]}
+        )
+        return dict(rows.all())
+
+    before = link_locations()
+    response = auth_client.put(f"/items/{item['id']}", json={"tag_ids": [backend["id"], later["id"]]})
+    assert [tag["name"] for tag in response.json()["tags"]] == ["backend", "later"]
+
+    after = link_locations()
+    assert set(after) == {backend["id"], later["id"]}
+    # the surviving link was neither deleted nor re-inserted
+    assert after[backend["id"]] == before[backend["id"]]
+
+def test_add_and_remove_item_tags(auth_client):
+    urgent, backend = (
+        auth_client.post("/tags/", json={"name": name}).json() for name in ("urgent", "backend")
+    )
+    item = auth_client.post("/items/", json={"name": "Item", "tag_ids": [urgent["id"]]}).json()
+
+    response = auth_client.post(f"/items/{item['id']}/tags", json=[urgent["id"], backend["id"]])
+    assert response.status_code == 200
+    assert response.json()["tags"] == [urgent, backend]
+
+    response = auth_client.post(f"/items/{item['id']}/tags", json=[9999])
+    assert response.status_code == 400
+    assert auth_client.get(f"/items/{item['id']}").json()["tags"] == [urgent, backend]
+
+    response = auth_client.request("DELETE", f"/items/{item['id']}/tags", json=[urgent["id"], 9999])
+    assert response.status_code == 200
+    assert response.json()["tags"] == [backend]
+
+    assert auth_client.post("/items/9999/tags", json=[urgent["id"]]).status_code == 404
+    assert auth_client.request("DELETE", "/items/9999/tags", json=[urgent["id"]]).status_code == 404
+
+def test_get_item_revalidates_with_etag(auth_client, count_queries):
+    created = auth_client.post("/items/", json={"name": "Item"})
+    item_id = created.json()["id"]
+    etag = created.headers["ETag"]
+    assert auth_client.get(f"/items/{item_id}").headers["ETag"] == etag
+
+    with count_queries() as statements:
+        response = auth_client.get(f"/items/{item_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert len(statements) == 1
+
+    updated = auth_client.put(f"/items/{item_id}", json={"name": "Renamed"})
+    assert updated.headers["ETag"] != etag
+    response = auth_client.get(f"/items/{item_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert response.headers["ETag"] == updated.headers["ETag"]
+
+def test_update_item_if_match(auth_client):
+    created = auth_client.post("/items/", json={"name": "Item"})
+    item_id = created.json()["id"]
+    etag = created.headers["ETag"]
+
+    first = auth_client.put(f"/items/{item_id}", json={"name": "Mine"}, headers={"If-Match": etag})
+    assert first.status_code == 200
+
+    # a second writer still holding the old ETag loses instead of overwriting
+    second = auth_client.put(f"/items/{item_id}", json={"name": "Theirs"}, headers={"If-Match": etag})
+    assert second.status_code == 412
+    assert auth_client.get(f"/items/{item_id}").json()["name"] == "Mine"
+
+    retried = auth_client.put(
+        f"/items/{item_id}", json={"name": "Theirs"}, headers={"If-Match": first.headers["ETag"]}
+    )
+    assert retried.status_code == 200
+    missing = auth_client.put("/items/9999", json={"name": "x"}, headers={"If-Match": etag})
+    assert missing.status_code == 404
+
+def test_tag_and_category_changes_change_item_etags(auth_client):
+    category = create_category(auth_client)
+    tag = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    item_id = auth_client.post(
+        "/items/", json={"name": "Item", "category_id": category["id"], "tag_ids": [tag["id"]]}
+    ).json()["id"]
+
+    etags = [auth_client.get(f"/items/{item_id}").headers["ETag"]]
+    auth_client.put(f"/tags/{tag['id']}", json={"name": "later"})
+    etags.append(auth_client.get(f"/items/{item_id}").headers["ETag"])
+    auth_client.put(f"/categories/{category['id']}", json={"name": "home"})
+    etags.append(auth_client.get(f"/items/{item_id}").headers["ETag"])
+    auth_client.delete(f"/tags/{tag['id']}")
+    etags.append(auth_client.get(f"/items/{item_id}").headers["ETag"])
+    new_tag = auth_client.post("/tags/", json={"name": "new"}).json()
+    auth_client.post(f"/items/{item_id}/tags", json=[new_tag["id"]])
+    etags.append(auth_client.get(f"/items/{item_id}").headers["ETag"])
+
+    assert len(set(etags)) == len(etags)
+
 def test_create_item_with_invalid_tag_id(auth_client):
     response = auth_client.post(
         "/items/",
         json={"name": "Bad item", "description": "x", "tag_ids": [9999]},
     )    
     assert response.status_code == 400
-    assert response.json()["detail"] == "One or more tags not found"
\ No newline at end of file
+    assert response.json()["detail"] == "One or more tags not found"
+
+def test_list_items_cursor_pagination(auth_client):
+    for i in range(5):
+        auth_client.post("/items/", json={"name": f"Task {i}", "description": "x"})
+
+    first = auth_client.get("/items/", params={"limit": 2})
+    assert first.status_code == 200
+    assert [item["name"] for item in first.json()] == ["Task 0", "Task 1"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = auth_client.get("/items/", params={"limit": 2, "cursor": cursor})
+    assert second.status_code == 200
+    assert [item["name"] for item in second.json()] == ["Task 2", "Task 3"]
+
+    last = auth_client.get("/items/", params={"limit": 2, "cursor": second.headers["X-Next-Cursor"]})
+    assert last.status_code == 200
+    assert [item["name"] for item in last.json()] == ["Task 4"]
+    assert "X-Next-Cursor" not in last.headers
+
+def test_list_items_count_metadata(auth_client, count_queries, monkeypatch):
+    tag = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    for i in range(5):
+        auth_client.post("/items/", json={"name": f"Task {i}", "tag_ids": [tag["id"]]})
+
+    with count_queries() as without_count:
+        response = auth_client.get("/items/", params={"limit": 2})
+    assert response.headers["X-Has-More"] == "true"
+    assert "X-Total-Count" not in response.headers
+
+    with count_queries() as with_count:
+        response = auth_client.get("/items/", params={"limit": 2, "count": "exact"})
+    assert response.headers["X-Total-Count"] == "5"
+    assert response.headers["X-Total-Count-Mode"] == "exact"
+    assert len(with_count) == len(without_count) + 1
+
+    last = auth_client.get("/items/", params={"limit": 10, "count": "exact"})
+    assert last.headers["X-Has-More"] == "false"
+
+    monkeypatch.setattr(items_routes.settings, "pagination_count_cap", 3)
+    capped = auth_client.get("/items/", params={"count": "capped"})
+    assert capped.headers["X-Total-Count"] == "3"
+    assert capped.headers["X-Total-Count-Mode"] == "capped"
+    below_cap = auth_client.get("/items/", params={"count": "capped", "q": "Task 1"})
+    assert below_cap.headers["X-Total-Count"] == "1"
+    assert below_cap.headers["X-Total-Count-Mode"] == "exact"
+
+    estimated = auth_client.get("/items/", params={"count": "estimated", "tag_ids": [tag["id"]]})
+    assert estimated.status_code == 200
+    assert estimated.headers["X-Total-Count-Mode"] == "estimated"
+    assert int(estimated.headers["X-Total-Count"]) >= 1
+
+def test_fast_json_matches_default_serialization(auth_client, monkeypatch):
+    create_tagged_items(auth_client, 3)
+    item_id = auth_client.get("/items/").json()[0]["id"]
+
+    fast_page = auth_client.get("/items/", params={"limit": 2})
+    fast_item = auth_client.get(f"/items/{item_id}")
+    monkeypatch.setattr(items_routes.settings, "fast_json", False)
+    default_page = auth_client.get("/items/", params={"limit": 2})
+    default_item = auth_client.get(f"/items/{item_id}")
+
+    assert fast_page.json() == default_page.json()
+    assert fast_page.headers["X-Next-Cursor"] == default_page.headers["X-Next-Cursor"]
+    assert fast_page.headers["content-type"] == default_page.headers["content-type"]
+    assert fast_item.json() == default_item.json()
+
+def test_model_response_keeps_repeated_headers():
+    response = Response()
+    response.set_cookie("first", "1")
+    response.set_cookie("second", "2")
+    response.headers["ETag"] = '"1"'
+
+    encoded = model_response(TypeAdapter(dict), {"ok": True}, response)
+    cookies = [value for name, value in encoded.raw_headers if name == b"set-cookie"]
+    assert [cookie.split(b";")[0] for cookie in cookies] == [b"first=1", b"second=2"]
+    assert encoded.headers["etag"] == '"1"'
+    assert encoded.headers["content-length"] == str(len(encoded.body))
+
+def test_list_items_invalid_cursor(auth_client):
+    response = auth_client.get("/items/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+def create_tagged_items(auth_client, count):
+    category = create_category(auth_client, name=f"cat-{count}")
+    tag1 = auth_client.post("/tags/", json={"name": f"a-{count}"}).json()
+    tag2 = auth_client.post("/tags/", json={"name": f"b-{count}"}).json()
+    return [
+        auth_client.post(
+            "/items/",
+            json={
+                "name": f"Item {i}",
+                "category_id": category["id"],
+                "tag_ids": [tag1["id"], tag2["id"]],
+            },
+        ).json()
+        for i in range(count)
+    ]
+
+def test_list_items_query_count_is_constant(auth_client, count_queries):
+    create_tagged_items(auth_client, 2)
+    with count_queries() as small_page:
+        response = auth_client.get("/items/", params={"limit": 2})
+    assert len(response.json()) == 2
+
+    create_tagged_items(auth_client, 8)
+    with count_queries() as large_page:
+        response = auth_client.get("/items/", params={"limit": 10})
+    assert len(response.json()) == 10
+    assert all(len(item["tags"]) == 2 and item["category"] for item in response.json())
+
+    assert len(large_page) == len(small_page)
+    assert len(large_page) <= 3
+
+def test_item_read_and_write_query_counts(auth_client, count_queries):
+    tag = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    category = create_category(auth_client)
+
+    with count_queries() as created:
+        item = auth_client.post(
+            "/items/",
+            json={"name": "Item", "category_id": category["id"], "tag_ids": [tag["id"]]},
+        ).json()
+    # tag lookup, INSERT ... RETURNING the item, insert item_tags
+    assert len(created) == 3
+    assert item["category"]["name"] == category["name"]
+    assert item["tags"] == [tag]
+
+    with count_queries() as fetched:
+        auth_client.get(f"/items/{item['id']}")
+    assert len(fetched) <= 3
+
+    with count_queries() as updated:
+        response = auth_client.put(f"/items/{item['id']}", json={"name": "Renamed"})
+    # UPDATE ... RETURNING the item, load its tags
+    assert len(updated) == 2
+    assert response.json() == item | {"name": "Renamed"}
+
+    with count_queries() as deleted:
+        response = auth_client.delete(f"/items/{item['id']}")
+    # DELETE item_tags ... RETURNING the tags, DELETE ... RETURNING the item
+    assert len(deleted) == 2
+    assert response.json() == item | {"name": "Renamed"}
+
+    with count_queries() as missing:
+        response = auth_client.put(f"/items/{item['id']}", json={"name": "Gone"})
+    assert response.status_code == 404
+    assert len(missing) == 1
+
+def test_bulk_create_items(auth_client, count_queries):
+    tag = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    category = create_category(auth_client)
+    payload = [
+        {"name": f"Bulk {i}", "category_id": category["id"], "tag_ids": [tag["id"]]}
+        for i in range(20)
+    ]
+    payload.append({"name": "Bad", "tag_ids": [9999]})
+
+    with count_queries() as statements:
+        response = auth_client.post("/items/bulk", json=payload)
+    assert response.status_code == 200
+    # tag check, category check, one INSERT for items, one for item_tags
+    assert len(statements) <= 5
+
+    results = response.json()
+    assert [r["status_code"] for r in results] == [201] * 20 + [400]
+    assert results[-1]["detail"] == "One or more tags not found"
+
+    item = auth_client.get(f"/items/{results[0]['id']}").json()
+    assert item["name"] == "Bulk 0"
+    assert [t["name"] for t in item["tags"]] == ["urgent"]
+    assert item["category"]["id"] == category["id"]
+
+def test_bulk_update_items(auth_client):
+    tag1 = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    tag2 = auth_client.post("/tags/", json={"name": "backend"}).json()
+    first = auth_client.post("/items/", json={"name": "One", "description": "keep", "tag_ids": [tag1["id"]]}).json()
+    second = auth_client.post("/items/", json={"name": "Two"}).json()
+
+    response = auth_client.put(
+        "/items/bulk",
+        json=[
+            {"id": first["id"], "name": "One updated", "tag_ids": [tag2["id"]]},
+            {"id": second["id"], "description": "added"},
+            {"id": 9999, "name": "Missing"},
+        ],
+    )
+    assert response.status_code == 200
+    assert [r["status_code"] for r in response.json()] == [200, 200, 404]
+
+    one = auth_client.get(f"/items/{first['id']}").json()
+    assert one["name"] == "One updated"
+    assert one["description"] == "keep"
+    assert [t["name"] for t in one["tags"]] == ["backend"]
+
+    two = auth_client.get(f"/items/{second['id']}").json()
+    assert two["name"] == "Two"
+    assert two["description"] == "added"
+
+def test_bulk_delete_items(auth_client):
+    tag = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    created = auth_client.post("/items/bulk", json=[{"name": "A", "tag_ids": [tag["id"]]}, {"name": "B"}]).json()
+    ids = [r["id"] for r in created]
+
+    response = auth_client.request("DELETE", "/items/bulk", json=ids + [9999])
+    assert response.status_code == 200
+    assert [r["status_code"] for r in response.json()] == [200, 200, 404]
+    assert auth_client.get("/items/").json() == []
+
+def test_export_items_ndjson(auth_client, count_queries, monkeypatch):
+    monkeypatch.setattr(items_routes, "EXPORT_BATCH_SIZE", 2)
+    tag = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    auth_client.post("/items/bulk", json=[{"name": f"Item {i}", "tag_ids": [tag["id"]]} for i in range(5)])
+    auth_client.post("/items/", json={"name": "Untagged"})
+
+    with count_queries() as statements:
+        response = auth_client.get("/items/export", params={"tag_ids": [tag["id"]]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == [f"Item {i}" for i in range(5)]
+    assert all(row["tags"] == [{"name": "urgent", "id": tag["id"]}] for row in rows)
+    # the idle timeout lifted, one streamed item query, plus one tag query
+    # per batch of two items
+    assert len(statements) == 5
+
+def test_export_lifts_idle_in_transaction_timeout(auth_client, db_session):
+    db_session.execute(text("SET LOCAL idle_in_transaction_session_timeout = '60s'"))
+    auth_client.post("/items/", json={"name": "Task"})
+
+    assert auth_client.get("/items/export").status_code == 200
+    # the test session shares the export's transaction
+    assert db_session.scalar(text("SHOW idle_in_transaction_session_timeout")) == "0"
+
+def test_export_items_csv(auth_client):
+    category = create_category(auth_client)
+    auth_client.post("/items/", json={"name": "Report, Q3", "description": "x", "category_id": category["id"]})
+
+    response = auth_client.get("/items/export", params={"format": "csv", "q": "report"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["name"] == "Report, Q3"
+    assert rows[0]["category"] == "work"
+    assert rows[0]["tags"] == ""
@@ -0,0 +1,280 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.jobs.runner import claim_job, job_runner, run_job
+from app.models.job import Job
+from app.models.user import User
+from conftest import engine
+
+
+@pytest.fixture()
+def job_db(db_session):
+    # the runner rolls back after a failed job; a savepoint keeps that from
+    # discarding the rest of the test's transaction
+    session = Session(bind=db_session.connection(), join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+
+
+def run_next(db: Session) -> int | None:
+    job = claim_job(db)
+    if job is None:
+        return None
+    run_job(db, job)
+    return job.id
+
+
+def create_items(client, count, **fields):
+    return [client.post("/items/", json={"name": f"item {index}", **fields}).json() for index in range(count)]
+
+
+def test_merge_tags_job(auth_client, job_db, monkeypatch):
+    monkeypatch.setattr(settings, "job_batch_size", 2)
+    source = auth_client.post("/tags/", json={"name": "colour"}).json()
+    target = auth_client.post("/tags/", json={"name": "color"}).json()
+    items = create_items(auth_client, 3, tag_ids=[source["id"]])
+    both = auth_client.post("/items/", json={"name": "both", "tag_ids": [source["id"], target["id"]]}).json()
+
+    response = auth_client.post("/jobs/", json={
+        "kind": "tags.merge",
+        "params": {"source_tag_id": source["id"], "target_tag_id": target["id"]},
+    })
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "queued"
+
+    assert run_next(job_db) == job["id"]
+    assert run_next(job_db) is None
+
+    job = auth_client.get(f"/jobs/{job['id']}").json()
+    assert job["status"] == "succeeded"
+    assert (job["progress"], job["total"]) == (4, 4)
+    assert job["result"] == {"merged_items": 4}
+    assert job["finished_at"] is not None
+
+    for item in items + [both]:
+        assert [tag["name"] for tag in auth_client.get(f"/items/{item['id']}").json()["tags"]] == ["color"]
+    assert auth_client.get(f"/tags/{source['id']}").status_code == 404
+
+
+def test_move_category_items_job(auth_client, job_db):
+    source = auth_client.post("/categories/", json={"name": "Old"}).json()
+    target = auth_client.post("/categories/", json={"name": "New"}).json()
+    items = create_items(auth_client, 3, category_id=source["id"])
+
+    job = auth_client.post("/jobs/", json={
+        "kind": "categories.move_items",
+        "params": {"source_category_id": source["id"], "target_category_id": target["id"]},
+    }).json()
+    run_next(job_db)
+
+    assert auth_client.get(f"/jobs/{job['id']}").json()["result"] == {"moved_items": 3}
+    for item in items:
+        assert auth_client.get(f"/items/{item['id']}").json()["category"]["name"] == "New"
+
+
+def test_jobs_touch_only_their_owners_items(client, auth_client, job_db):
+    tag = auth_client.post("/tags/", json={"name": "colour"}).json()
+    target_tag = auth_client.post("/tags/", json={"name": "color"}).json()
+    category = auth_client.post("/categories/", json={"name": "Old"}).json()
+    target_category = auth_client.post("/categories/", json={"name": "New"}).json()
+    fields = {"tag_ids": [tag["id"]], "category_id": category["id"]}
+    own = create_items(auth_client, 2, **fields)
+
+    client.post("/auth/register", json={"email": "other@example.com", "password": "password123"})
+    token = client.post(
+        "/auth/login", data={"username": "other@example.com", "password": "password123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    theirs = client.post("/items/", json={"name": "theirs", **fields}, headers=headers).json()
+    etag = client.get(f"/items/{theirs['id']}", headers=headers).headers["etag"]
+
+    merge = auth_client.post("/jobs/", json={
+        "kind": "tags.merge", "params": {"source_tag_id": tag["id"], "target_tag_id": target_tag["id"]},
+    }).json()
+    move = auth_client.post("/jobs/", json={
+        "kind": "categories.move_items",
+        "params": {"source_category_id": category["id"], "target_category_id": target_category["id"]},
+    }).json()
+    run_next(job_db)
+    run_next(job_db)
+
+    assert auth_client.get(f"/jobs/{merge['id']}").json()["result"] == {"merged_items": 2}
+    assert auth_client.get(f"/jobs/{move['id']}").json()["result"] == {"moved_items": 2}
+    for item in own:
+        item = auth_client.get(f"/items/{item['id']}").json()
+        assert ([tag["name"] for tag in item["tags"]], item["category"]["name"]) == (["color"], "New")
+
+    response = client.get(f"/items/{theirs['id']}", headers=headers)
+    assert response.headers["etag"] == etag
+    untouched = response.json()
+    assert ([tag["name"] for tag in untouched["tags"]], untouched["category"]["name"]) == (["colour"], "Old")
+    # still linked to the other user's item, so the source tag stays
+    assert auth_client.get(f"/tags/{tag['id']}").status_code == 200
+
+
+def test_job_fails_with_a_readable_error(auth_client, job_db):
+    job = auth_client.post("/jobs/", json={
+        "kind": "tags.merge", "params": {"source_tag_id": 998, "target_tag_id": 999},
+    }).json()
+    run_next(job_db)
+
+    job = auth_client.get(f"/jobs/{job['id']}").json()
+    assert job["status"] == "failed"
+    assert job["error"] == "Tag not found"
+
+
+def test_enqueue_validates_kind_and_params(auth_client):
+    assert auth_client.post("/jobs/", json={"kind": "nope"}).status_code == 400
+
+    response = auth_client.post("/jobs/", json={
+        "kind": "tags.merge", "params": {"source_tag_id": 1, "target_tag_id": 1},
+    })
+    assert response.status_code == 422
+    response = auth_client.post("/jobs/", json={"kind": "tags.merge", "params": {"source_tag_id": 1}})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "params", "target_tag_id"]
+
+
+def test_cancel_queued_job(auth_client, job_db):
+    job = auth_client.post("/jobs/", json={
+        "kind": "categories.move_items", "params": {"source_category_id": 1},
+    }).json()
+
+    cancelled = auth_client.post(f"/jobs/{job['id']}/cancel").json()
+    assert cancelled["status"] == "cancelled"
+    assert run_next(job_db) is None
+    assert auth_client.post(f"/jobs/{job['id']}/cancel").status_code == 409
+
+
+def test_cancel_running_job_stops_after_current_batch(auth_client, job_db, monkeypatch):
+    monkeypatch.setattr(settings, "job_batch_size", 1)
+    source = auth_client.post("/categories/", json={"name": "Old"}).json()
+    create_items(auth_client, 3, category_id=source["id"])
+    job = auth_client.post("/jobs/", json={
+        "kind": "categories.move_items", "params": {"source_category_id": source["id"]},
+    }).json()
+
+    claimed = claim_job(job_db)
+    running = auth_client.post(f"/jobs/{job['id']}/cancel").json()
+    assert (running["status"], running["cancel_requested"]) == ("running", True)
+
+    run_job(job_db, claimed)
+    job = auth_client.get(f"/jobs/{job['id']}").json()
+    assert job["status"] == "cancelled"
+    assert job["progress"] == 1
+
+
+def test_interrupted_job_is_queued_again_without_using_an_attempt(auth_client, job_db, monkeypatch):
+    monkeypatch.setattr(settings, "job_batch_size", 1)
+    source = auth_client.post("/categories/", json={"name": "Old"}).json()
+    create_items(auth_client, 3, category_id=source["id"])
+    job = auth_client.post("/jobs/", json={
+        "kind": "categories.move_items", "params": {"source_category_id": source["id"]},
+    }).json()
+
+    # the worker shuts down after the first batch
+    run_job(job_db, claim_job(job_db), stopping=lambda: True)
+    job = auth_client.get(f"/jobs/{job['id']}").json()
+    assert (job["status"], job["progress"]) == ("queued", 1)
+
+    reclaimed = claim_job(job_db)
+    assert (reclaimed.id, reclaimed.attempts, reclaimed.progress) == (job["id"], 1, 1)
+    run_job(job_db, reclaimed)
+    assert auth_client.get(f"/jobs/{job['id']}").json()["result"] == {"moved_items": 3}
+
+
+def test_jobs_are_private(client, auth_client):
+    job = auth_client.post("/jobs/", json={
+        "kind": "categories.move_items", "params": {"source_category_id": 1},
+    }).json()
+    assert len(auth_client.get("/jobs/").json()) == 1
+
+    client.post("/auth/register", json={"email": "other@example.com", "password": "password123"})
+    token = client.post(
+        "/auth/login", data={"username": "other@example.com", "password": "password123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get(f"/jobs/{job['id']}", headers=headers).status_code == 404
+    assert client.post(f"/jobs/{job['id']}/cancel", headers=headers).status_code == 404
+    assert client.get("/jobs/", headers=headers).json() == []
+
+
+def test_stale_running_job_is_claimed_again(auth_client, job_db):
+    job = auth_client.post("/jobs/", json={
+        "kind": "categories.move_items", "params": {"source_category_id": 1},
+    }).json()
+    assert claim_job(job_db).id == job["id"]
+    assert claim_job(job_db) is None
+
+    # its worker died without a word
+    stale = datetime.now(timezone.utc) - timedelta(seconds=settings.job_stale_seconds + 60)
+    job_db.execute(update(Job).where(Job.id == job["id"]).values(heartbeat_at=stale))
+    reclaimed = claim_job(job_db)
+    assert (reclaimed.id, reclaimed.attempts) == (job["id"], 2)
+
+
+def test_worker_that_lost_its_claim_commits_nothing(auth_client, job_db, monkeypatch):
+    monkeypatch.setattr(settings, "job_batch_size", 1)
+    source = auth_client.post("/categories/", json={"name": "Old"}).json()
+    target = auth_client.post("/categories/", json={"name": "New"}).json()
+    items = create_items(auth_client, 2, category_id=source["id"])
+    job = auth_client.post("/jobs/", json={
+        "kind": "categories.move_items",
+        "params": {"source_category_id": source["id"], "target_category_id": target["id"]},
+    }).json()
+    first = claim_job(job_db)
+
+    # its first batch ran so long that another worker took the job over
+    stale = datetime.now(timezone.utc) - timedelta(seconds=settings.job_stale_seconds + 60)
+    job_db.execute(update(Job).where(Job.id == job["id"]).values(heartbeat_at=stale))
+    second = claim_job(job_db)
+    assert second.attempts == 2
+
+    run_job(job_db, first)
+    job = auth_client.get(f"/jobs/{job['id']}").json()
+    assert (job["status"], job["progress"]) == ("running", 0)
+    for item in items:
+        assert auth_client.get(f"/items/{item['id']}").json()["category"]["name"] == "Old"
+
+    run_job(job_db, second)
+    assert auth_client.get(f"/jobs/{job['id']}").json()["result"] == {"moved_items": 2}
+
+
+def test_concurrent_workers_skip_locked_jobs():
+    # committed rows, so that two connections can race for them
+    with engine.begin() as connection:
+        user_id = connection.execute(
+            insert(User).values(email="worker@example.com", hashed_password="x").returning(User.id)
+        ).scalar_one()
+        job_ids = connection.execute(
+            insert(Job).returning(Job.id),
+            [{"user_id": user_id, "kind": "categories.move_items"}] * 2,
+        ).scalars().all()
+
+    try:
+        with Session(engine) as first, Session(engine) as second:
+            # the first worker holds the oldest job's row lock
+            locked = first.execute(
+                select(Job.id).where(Job.id.in_(job_ids)).order_by(Job.id).limit(1).with_for_update()
+            ).scalar_one()
+            claimed = claim_job(second)
+            assert locked == job_ids[0]
+            assert claimed.id == job_ids[1]
+            first.rollback()
+    finally:
+        with engine.begin() as connection:
+            connection.execute(delete(Job).where(Job.id.in_(job_ids)))
+            connection.execute(delete(User).where(User.id == user_id))
+
+
+def test_runner_threads_start_and_stop():
+    job_runner.start(workers=2, poll_interval=0.01)
+    job_runner.wake()
+    job_runner.stop(timeout=5)
+    assert job_runner._threads == []
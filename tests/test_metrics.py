@@ -0,0 +1,38 @@
+def metric_value(body: str, prefix: str) -> float:
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found")
+
+
+def test_metrics_label_requests_by_route_template(client, auth_headers):
+    for _ in range(2):
+        response = client.get("/items/999999", headers=auth_headers)
+        assert response.status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+
+    labels = 'method="GET",route="/items/{item_id}",status="404"'
+    assert metric_value(body, f"atlas_http_request_duration_seconds_count{{{labels}}}") >= 2
+    assert "/items/999999" not in body
+    assert metric_value(body, "atlas_http_requests_in_flight") == 1
+
+
+def test_metrics_count_queries_per_request(client, auth_headers):
+    client.post("/categories/", json={"name": "Books"}, headers=auth_headers)
+    before = client.get("/metrics").text
+    labels = 'method="GET",route="/categories/"'
+    prefix = f"atlas_http_request_db_queries_count{{{labels}}}"
+    count_before = metric_value(before, prefix) if prefix in before else 0
+    sum_before = metric_value(before, f"atlas_http_request_db_queries_sum{{{labels}}}") if prefix in before else 0
+
+    response = client.get("/categories/", headers=auth_headers)
+    assert response.status_code == 200
+
+    after = client.get("/metrics").text
+    assert metric_value(after, prefix) == count_before + 1
+    assert metric_value(after, f"atlas_http_request_db_queries_sum{{{labels}}}") > sum_before
+    assert 'atlas_db_pool_checked_out{engine="sync"}' in after
@@ -0,0 +1,213 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+from app.db import deps
+from app.db.base import Base
+from app.db.replicas import LAG_QUERY, PRIMARY_COOKIE, ReplicaRoutingMiddleware, ReplicaSet, use_replica
+from app.db.session import database, engine_options
+from conftest import engine
+
+
+def replica_url() -> str | None:
+    """A second local database standing in for a replica.
+
+    TEST_REPLICA_DATABASE_URL if set, else TEST_DATABASE_URL's database with a
+    _replica suffix, created on first use.
+    """
+    url = os.getenv("TEST_REPLICA_DATABASE_URL")
+    if url:
+        return url
+
+    primary = make_url(os.environ["TEST_DATABASE_URL"])
+    replica = primary.set(database=f"{primary.database}_replica")
+    admin = create_engine(primary, isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": replica.database}
+            ).scalar()
+            if not exists:
+                connection.execute(text(f"CREATE DATABASE {replica.database} ENCODING 'UTF8' TEMPLATE template0"))
+    except DBAPIError:
+        return None
+    finally:
+        admin.dispose()
+    return replica.render_as_string(hide_password=False)
+
+
+@pytest.fixture(scope="module")
+def replicas():
+    url = replica_url()
+    if url is None:
+        pytest.skip("no replica database available")
+
+    replica_set = ReplicaSet([url], engine_options(), max_lag=5, check_interval=60)
+    Base.metadata.create_all(bind=replica_set.replicas[0].engine)
+    yield replica_set
+    Base.metadata.drop_all(bind=replica_set.replicas[0].engine)
+    replica_set.dispose()
+
+
+@pytest.fixture()
+def routed(replicas, monkeypatch):
+    monkeypatch.setattr(database, "replicas", replicas)
+    replicas.checked_at = None
+    token = use_replica.set(True)
+    yield replicas
+    use_replica.reset(token)
+
+
+def current_database(db) -> str:
+    return db.execute(text("SELECT current_database()")).scalar()
+
+
+def test_reads_go_to_a_healthy_replica(routed):
+    replica_database = routed.replicas[0].engine.url.database
+
+    db_gen = deps.get_sync_db()
+    db = next(db_gen)
+    try:
+        assert deps.is_replica(db)
+        assert current_database(db) == replica_database
+    finally:
+        db_gen.close()
+
+    assert routed.replicas[0].lag_seconds == 0
+
+
+def test_async_reads_go_to_a_healthy_replica(routed):
+    replica = routed.replicas[0]
+
+    async def main():
+        try:
+            async for db in deps.get_async_db():
+                assert deps.is_replica(db)
+                return (await db.execute(text("SELECT current_database()"))).scalar()
+        finally:
+            # its pooled connections belong to this event loop
+            await replica.async_engine.dispose()
+
+    assert asyncio.run(main()) == replica.engine.url.database
+
+
+def test_lagging_replica_falls_back_to_primary(routed, monkeypatch):
+    monkeypatch.setattr(routed.replicas[0], "measure_lag", lambda: 60.0)
+
+    db_gen = deps.get_sync_db()
+    db = next(db_gen)
+    try:
+        assert not deps.is_replica(db)
+        assert current_database(db) == make_url(os.environ["TEST_DATABASE_URL"]).database
+    finally:
+        db_gen.close()
+
+
+@pytest.mark.parametrize(("receiver", "lag"), [("streaming", 0), ("stopping", 60), (None, 60)])
+def test_lag_of_a_standby_that_replayed_everything_it_received(receiver, lag):
+    # stand-ins for a standby's functions and WAL receiver view, found ahead
+    # of pg_catalog's because the search path names pg_catalog explicitly
+    with engine.connect() as connection:
+        connection.execute(text("CREATE SCHEMA standby"))
+        connection.execute(text("SET LOCAL search_path = standby, pg_catalog"))
+        for name, returns, body in (
+            ("pg_is_in_recovery", "boolean", "SELECT true"),
+            ("pg_last_wal_receive_lsn", "pg_lsn", "SELECT '0/100'::pg_lsn"),
+            ("pg_last_wal_replay_lsn", "pg_lsn", "SELECT '0/100'::pg_lsn"),
+            ("pg_last_xact_replay_timestamp", "timestamptz", "SELECT now() - interval '60 seconds'"),
+        ):
+            connection.execute(text(f"CREATE FUNCTION standby.{name}() RETURNS {returns} LANGUAGE sql AS $${body}$$"))
+        # the view has no row at all while the receiver is not running
+        rows = f"SELECT '{receiver}'::text AS status" + (" WHERE false" if receiver is None else "")
+        connection.execute(text(f"CREATE VIEW standby.pg_stat_wal_receiver AS {rows}"))
+
+        assert round(connection.execute(LAG_QUERY).scalar()) == lag
+        connection.rollback()
+
+
+def test_unreachable_replica_falls_back_to_primary():
+    unreachable = make_url(os.environ["TEST_DATABASE_URL"]).set(database="atlas_no_such_database")
+    replica_set = ReplicaSet(
+        [unreachable.render_as_string(hide_password=False)], engine_options(), max_lag=5, check_interval=60
+    )
+    try:
+        replica_set.check()
+        assert replica_set.replicas[0].lag_seconds is None
+        assert replica_set.pick() is None
+    finally:
+        replica_set.dispose()
+
+
+def test_writes_are_never_routed_to_a_replica(routed):
+    token = use_replica.set(False)
+    try:
+        db_gen = deps.get_sync_db()
+        db = next(db_gen)
+        assert not deps.is_replica(db)
+        db_gen.close()
+    finally:
+        use_replica.reset(token)
+
+
+@pytest.fixture()
+def routing_client():
+    app = FastAPI()
+
+    @app.get("/target")
+    async def target():
+        return {"replica": use_replica.get()}
+
+    @app.post("/write")
+    async def write():
+        return {"replica": use_replica.get()}
+
+    @app.post("/fail", status_code=422)
+    async def fail():
+        return {}
+
+    app.add_middleware(ReplicaRoutingMiddleware, window=10)
+    return TestClient(app)
+
+
+def test_middleware_routes_reads_to_replicas_and_writes_to_primary(routing_client):
+    assert routing_client.get("/target").json() == {"replica": True}
+    assert routing_client.post("/write").json() == {"replica": False}
+
+
+def test_client_reads_its_own_writes_from_primary(routing_client):
+    response = routing_client.post("/write")
+    assert PRIMARY_COOKIE in response.cookies
+    assert "Max-Age=10" in response.headers["set-cookie"]
+
+    # the test client sends the cookie back
+    assert routing_client.get("/target").json() == {"replica": False}
+
+    routing_client.cookies.clear()
+    assert routing_client.get("/target").json() == {"replica": True}
+
+
+def test_client_without_cookies_is_recognised_by_its_token(routing_client):
+    headers = {"Authorization": "Bearer abc"}
+    routing_client.post("/write", headers=headers)
+    routing_client.cookies.clear()
+
+    assert routing_client.get("/target", headers=headers).json() == {"replica": False}
+    assert routing_client.get("/target", headers={"Authorization": "Bearer other"}).json() == {"replica": True}
+
+
+def test_failed_write_keeps_reads_on_replicas(routing_client):
+    response = routing_client.post("/fail")
+    assert response.status_code == 422
+    assert PRIMARY_COOKIE not in response.cookies
+    assert routing_client.get("/target").json() == {"replica": True}
+
+
+def test_expired_cookie_is_ignored(routing_client):
+    routing_client.cookies.set(PRIMARY_COOKIE, "1")
+    assert routing_client.get("/target").json() == {"replica": True}
@@ -0,0 +1,35 @@
+from app import server
+from app.db.session import database
+
+
+def test_available_cpus_respects_cgroup_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: {0, 1, 2, 3})
+    cpu_max = tmp_path / "cpu.max"
+    monkeypatch.setattr(server, "CGROUP_CPU_MAX", cpu_max)
+
+    cpu_max.write_text("150000 100000\n")
+    assert server.available_cpus() == 2
+    cpu_max.write_text("max 100000\n")
+    assert server.available_cpus() == 4
+    cpu_max.unlink()
+    assert server.available_cpus() == 4
+
+
+def test_gunicorn_options(monkeypatch):
+    monkeypatch.setattr(server.settings, "web_workers", 0)
+    monkeypatch.setattr(server, "available_cpus", lambda: 3)
+    options = server.gunicorn_options()
+    assert options["workers"] == 3
+    assert options["preload_app"] is True
+    assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+
+    monkeypatch.setattr(server.settings, "web_workers", 8)
+    assert server.gunicorn_options()["workers"] == 8
+
+
+def test_post_fork_gives_the_worker_fresh_pools():
+    pools = database.engine.pool, database.async_engine.sync_engine.pool
+    server.post_fork(server=None, worker=None)
+    assert database.engine.pool is not pools[0]
+    assert database.async_engine.sync_engine.pool is not pools[1]
+    assert database.engine.pool.snapshot()["checkouts"] == 0
@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT_DIR
+
+# importing app.main measured about 0.17 s once it stopped pulling in the
+# framework, the routes and the engines (about 1.05 s before); the budget
+# leaves room for slower machines but not for those imports coming back
+IMPORT_BUDGET_SECONDS = 0.5
+
+IMPORT_APP = """
+import json, sys, time
+started_at = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started_at
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+CREATE_APP = """
+import json, sys
+from app.core.config import Settings
+from app.main import create_app
+from app.db.session import database
+app = create_app(Settings(database_url="postgresql+psycopg://nobody@127.0.0.1:1/none", secret_key="x"))
+print(json.dumps({"routes": len(app.routes), "opened": database.opened, "psycopg": "psycopg" in sys.modules}))
+"""
+
+CREATE_APP_TWICE = """
+import json
+from app.core.config import Settings
+from app.main import create_app
+from app.api.deps import user_cache
+from app.core.caches import tags_cache
+from app.core.hashing import hashing_pool
+from app.core.security import password_context
+url = "postgresql+psycopg://nobody@127.0.0.1:1/none"
+create_app(Settings(database_url=url, secret_key="x", bcrypt_rounds=5, auth_cache_ttl_seconds=10))
+second = Settings(
+    database_url=url, secret_key="x", bcrypt_rounds=6, auth_cache_ttl_seconds=20, auth_cache_max_entries=7,
+    list_cache_ttl_seconds=30, password_hash_workers=3, password_hash_max_pending=9,
+)
+create_app(second)
+print(json.dumps({
+    "user_cache": [user_cache.maxsize, user_cache.ttl],
+    "tags_cache": tags_cache.ttl,
+    "hashing_pool": [hashing_pool.workers, hashing_pool.max_pending, hashing_pool.rounds],
+    "rounds": password_context().to_dict()["bcrypt__default_rounds"],
+}))
+"""
+
+
+def run_python(code: str) -> dict:
+    # a fresh interpreter without any database settings in its environment
+    env = {key: value for key, value in os.environ.items() if key not in ("DATABASE_URL", "SECRET_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def test_importing_the_app_is_cheap_and_needs_no_settings():
+    runs = [run_python(IMPORT_APP) for _ in range(3)]
+
+    assert min(run["seconds"] for run in runs) < IMPORT_BUDGET_SECONDS
+    modules = set(runs[0]["modules"])
+    for heavy in ("fastapi", "sqlalchemy", "psycopg", "app.api.router", "app.db.session"):
+        assert heavy not in modules
+
+
+def test_create_app_opens_no_database_until_started():
+    result = run_python(CREATE_APP)
+
+    assert result["routes"] > 0
+    assert result["opened"] is False
+    assert result["psycopg"] is False
+
+
+def test_a_second_create_app_applies_its_own_settings():
+    result = run_python(CREATE_APP_TWICE)
+
+    assert result == {"user_cache": [7, 20], "tags_cache": 30, "hashing_pool": [3, 9, 6], "rounds": 6}
@@ -40,4 +40,24 @@ def test_delete_tag(auth_client):
     assert response.status_code == 200
 
     get_response = auth_client.get(f"/tags/{tag_id}")
-    assert get_response.status_code == 404
\ No newline at end of file
+    assert get_response.status_code == 404
+
+def test_delete_tag_in_use_unlinks_items(auth_client):
+    tag = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    item = auth_client.post("/items/", json={"name": "Task", "tag_ids": [tag["id"]]}).json()
+
+    response = auth_client.delete(f"/tags/{tag['id']}")
+    assert response.json() == tag
+    assert auth_client.get(f"/items/{item['id']}").json()["tags"] == []
+
+def test_list_tags_not_modified_until_a_write(auth_client):
+    created = auth_client.post("/tags/", json={"name": "urgent"}).json()
+    etag = auth_client.get("/tags/").headers["ETag"]
+
+    response = auth_client.get("/tags/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    auth_client.put(f"/tags/{created['id']}", json={"name": "high"})
+    response = auth_client.get("/tags/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [t["name"] for t in response.json()] == ["high"]